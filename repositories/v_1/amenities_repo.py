@@ -0,0 +1,106 @@
+"""
+Amenities Repo module contains the cached amenities catalogue and the per-merchant amenity bitmaps.
+"""
+import threading
+from collections import namedtuple
+
+from common.constants.values import CommonValues
+from models.merchant_attribute import MerchantAttribute
+from models.merchant_attributes_travel import MerchantAttributesTravel
+from repositories.v_1.cache_repo import TTLCache
+
+Amenity = namedtuple('Amenity', ['attribute_key', 'attribute_name', 'image_url', 'bit'])
+
+
+class AmenitiesRepo(object):
+    """
+    Builds the amenities of a merchant by intersecting its amenity bitmap with the catalogue of the locale.
+
+    Every attribute key of the catalogue is given a bit, a merchant's bitmap has the bits of the amenities it offers
+    i.e. the ones whose travel attribute is neither 0 nor -1. Catalogues are cached per locale and bitmaps per
+    merchant in every worker. Amenities are updated outside this service, so changes show up once the cached entries
+    expire i.e. within `AMENITIES_CACHE_TTL` seconds.
+    """
+    NOT_OFFERED_VALUES = (0, -1)
+    AMENITIES_CACHE_TTL = 15 * 60
+
+    catalogue_cache = TTLCache(maxsize=32, ttl=AMENITIES_CACHE_TTL, name='amenities_catalogue')
+    merchant_amenities_cache = TTLCache(maxsize=20000, ttl=AMENITIES_CACHE_TTL, name='merchant_amenities')
+
+    attribute_bits = {}
+    _attribute_bits_lock = threading.Lock()
+
+    @classmethod
+    def get_attribute_bit(cls, attribute_key):
+        """
+        Returns the bit of the attribute key, assigning the next free bit to a new key.
+
+        :rtype: int
+        """
+        bit = cls.attribute_bits.get(attribute_key)
+        if bit is None:
+            with cls._attribute_bits_lock:
+                bit = cls.attribute_bits.setdefault(attribute_key, 1 << len(cls.attribute_bits))
+        return bit
+
+    @classmethod
+    def get_catalogue(cls, locale):
+        """
+        Returns the travel amenities catalogue of the locale.
+
+        :param str locale: locale of the amenity names.
+        :rtype: list
+        """
+        def get_amenities():
+            return [
+                Amenity(
+                    attribute_key=amenity.attribute_key,
+                    attribute_name=amenity.attribute_name,
+                    image_url=amenity.image_url,
+                    bit=cls.get_attribute_bit(amenity.attribute_key)
+                )
+                for amenity in MerchantAttribute.get_amenities_by_locale(
+                    locale=locale,
+                    category=CommonValues.TRAVEL_CATEGORY_ID
+                )
+            ]
+
+        return cls.catalogue_cache.get_or_set(locale, get_amenities)
+
+    @classmethod
+    def get_merchant_bitmap(cls, merchant_id):
+        """
+        Returns the bitmap of amenities offered by the merchant.
+
+        The bitmap covers the attribute keys known when it was built, it is rebuilt once new keys show up.
+
+        :param int merchant_id: ID of merchant.
+        :rtype: int
+        """
+        def get_bitmap():
+            merchant_attributes_travel = MerchantAttributesTravel.get_attributes(merchant_id)
+            bitmap = 0
+            if merchant_attributes_travel:
+                for attribute_key, bit in list(cls.attribute_bits.items()):
+                    if getattr(merchant_attributes_travel, attribute_key, 0) not in cls.NOT_OFFERED_VALUES:
+                        bitmap |= bit
+            return len(cls.attribute_bits), bitmap
+
+        known_keys, bitmap = cls.merchant_amenities_cache.get_or_set(merchant_id, get_bitmap)
+        if known_keys != len(cls.attribute_bits):
+            cls.merchant_amenities_cache.delete(merchant_id)
+            known_keys, bitmap = cls.merchant_amenities_cache.get_or_set(merchant_id, get_bitmap)
+        return bitmap
+
+    @classmethod
+    def get_merchant_amenities(cls, merchant_id, locale):
+        """
+        Returns the amenities of the catalogue offered by the merchant.
+
+        :param int merchant_id: ID of merchant.
+        :param str locale: locale of the amenity names.
+        :rtype: list
+        """
+        catalogue = cls.get_catalogue(locale)
+        bitmap = cls.get_merchant_bitmap(merchant_id)
+        return [amenity for amenity in catalogue if bitmap & amenity.bit]
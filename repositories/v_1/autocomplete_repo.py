@@ -0,0 +1,289 @@
+"""
+Autocomplete Repo module contains the in-process autocomplete index of travel destinations and hotels.
+"""
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from heapq import nsmallest
+
+import numpy
+from elasticsearch.helpers import scan
+from flask import current_app
+
+from common.constants.values import CommonValues
+from repositories.v_1.geo_repo import CountryIndex, get_haversine_distances
+
+
+class AutocompleteIndex(object):
+    """
+    Sorted-array prefix index over the `name` and `address` tokens of et_travel documents.
+
+    Every field keeps a sorted list of `(token, document_index)` pairs so all documents having a token starting with
+    a prefix are found with a binary search followed by a short scan. Like the ES query, all query tokens must match
+    within the same field, name matches weigh twice the address matches, hotels are slightly pushed down and then
+    decayed by their distance from the user.
+    """
+    NAME_WEIGHT = 2.0
+    ADDRESS_WEIGHT = 1.0
+    EXACT_TOKEN_BONUS = 0.5
+    HOTEL_NEGATIVE_BOOST = 0.9
+    GEO_DECAY_SCALE_METERS = 10000
+    GEO_DECAY = 0.5
+    MAX_CHARACTER = chr(0x10FFFF)
+
+    def __init__(self, hits):
+        self.hits = []
+        self.fields = {'name': ([], []), 'address': ([], [])}
+        self.name_lengths, self.hotel_lats, self.hotel_lngs, self.is_hotel = [], [], [], []
+        name_pairs, address_pairs = [], []
+        for hit in hits:
+            document = hit.get('_source', {})
+            document_index = len(self.hits)
+            self.hits.append(hit)
+            self.name_lengths.append(len(document.get('name') or ''))
+            name_pairs.extend((token, document_index) for token in set(self.tokenize(document.get('name'))))
+            address_pairs.extend((token, document_index) for token in set(self.tokenize(document.get('address'))))
+            lat, lng = self.get_document_coordinates(document)
+            self.is_hotel.append(document.get('type') == 'hotel' and lat is not None)
+            self.hotel_lats.append(lat or 0.0)
+            self.hotel_lngs.append(lng or 0.0)
+
+        for field, pairs in (('name', name_pairs), ('address', address_pairs)):
+            pairs.sort()
+            tokens, document_indexes = self.fields[field]
+            tokens.extend(pair[0] for pair in pairs)
+            document_indexes.extend(pair[1] for pair in pairs)
+
+        self.hotel_lats = numpy.array(self.hotel_lats, dtype=float)
+        self.hotel_lngs = numpy.array(self.hotel_lngs, dtype=float)
+        self.built_at = time.time()
+
+    def __len__(self):
+        return len(self.hits)
+
+    @staticmethod
+    def tokenize(text):
+        """
+        Returns the normalized tokens of the passed text.
+
+        :rtype: list
+        """
+        return CountryIndex.normalize(text).split()
+
+    @staticmethod
+    def get_document_coordinates(document):
+        """
+        Returns the coordinates of a document from its `geo_location` or `lat`/`lng` fields.
+
+        :rtype: tuple
+        """
+        geo_location = document.get('geo_location')
+        if isinstance(geo_location, dict):
+            lat, lng = geo_location.get('lat'), geo_location.get('lon')
+        else:
+            lat, lng = document.get('lat'), document.get('lng')
+        try:
+            return float(lat), float(lng)
+        except (TypeError, ValueError):
+            return None, None
+
+    def get_prefix_matches(self, field, prefix):
+        """
+        Returns the indexes of documents having a token starting with the prefix in the field along with the ones
+        having the exact token.
+
+        :rtype: tuple
+        """
+        tokens, document_indexes = self.fields[field]
+        start = bisect_left(tokens, prefix)
+        exact_end = bisect_right(tokens, prefix, start)
+        end = bisect_left(tokens, prefix + self.MAX_CHARACTER, exact_end)
+        return set(document_indexes[start:end]), document_indexes[start:exact_end]
+
+    def get_field_scores(self, field, query_tokens, weight):
+        """
+        Returns the score of all documents matching all query tokens in the field.
+
+        :rtype: dict
+        """
+        matched_documents = None
+        exact_token_counts = {}
+        for token in query_tokens:
+            matches, exact_matches = self.get_prefix_matches(field, token)
+            matched_documents = matches if matched_documents is None else matched_documents & matches
+            if not matched_documents:
+                return {}
+            for document_index in exact_matches:
+                exact_token_counts[document_index] = exact_token_counts.get(document_index, 0) + 1
+
+        return {
+            document_index: weight * (
+                1 + self.EXACT_TOKEN_BONUS * exact_token_counts.get(document_index, 0) / len(query_tokens)
+            )
+            for document_index in matched_documents
+        }
+
+    def search(self, query, lat, lng, size):
+        """
+        Returns the top hits for the query in the same shape as ES hits.
+
+        :param str query: text typed by the user.
+        :param float lat: latitude of user.
+        :param float lng: longitude of user.
+        :param int size: maximum number of hits.
+        :rtype: list
+        """
+        query_tokens = self.tokenize(query)
+        if not query_tokens:
+            return []
+
+        scores = self.get_field_scores('name', query_tokens, self.NAME_WEIGHT)
+        for document_index, score in self.get_field_scores('address', query_tokens, self.ADDRESS_WEIGHT).items():
+            scores[document_index] = max(score, scores.get(document_index, 0))
+
+        hotel_indexes = [document_index for document_index in scores if self.is_hotel[document_index]]
+        if hotel_indexes:
+            distances = get_haversine_distances(
+                lat or 0.0,
+                lng or 0.0,
+                self.hotel_lats[hotel_indexes],
+                self.hotel_lngs[hotel_indexes]
+            )
+            decay_factor = math.log(self.GEO_DECAY) / (self.GEO_DECAY_SCALE_METERS ** 2)
+            decays = self.HOTEL_NEGATIVE_BOOST * numpy.exp(decay_factor * distances ** 2)
+            for document_index, decay in zip(hotel_indexes, decays.tolist()):
+                scores[document_index] *= decay
+
+        ranked = nsmallest(
+            size,
+            scores,
+            key=lambda document_index: (-scores[document_index], self.name_lengths[document_index])
+        )
+        return [self.hits[document_index] for document_index in ranked]
+
+
+class AutocompleteRepo(object):
+    """
+    Keeps the autocomplete index of current worker and refreshes it in the background.
+
+    The index is built from the snapshot file at `AUTOCOMPLETE_SNAPSHOT_FILE` (JSON lines of ES hits or sources) if
+    configured, else by scrolling the et_travel ES index. It is rebuilt every `AUTOCOMPLETE_REFRESH_INTERVAL` seconds
+    and swapped in atomically.
+    """
+    DEFAULT_REFRESH_INTERVAL = 15 * 60
+    DEFAULT_RESULTS_SIZE = 10
+
+    _index = None
+    _loader = None
+    _loader_pid = None
+    _loader_lock = threading.Lock()
+
+    @staticmethod
+    def read_snapshot(snapshot_file):
+        """
+        Reads the hits from the snapshot file.
+
+        :rtype: list
+        """
+        hits = []
+        with open(snapshot_file, encoding='utf-8') as snapshot:
+            for line_number, line in enumerate(snapshot):
+                line = line.strip()
+                if line:
+                    document = json.loads(line)
+                    if '_source' not in document:
+                        document = {'_id': document.get('id', line_number), '_source': document}
+                    hits.append(document)
+        return hits
+
+    @classmethod
+    def build_index(cls):
+        """
+        Builds a new index from the snapshot file or from ES.
+
+        :rtype: AutocompleteIndex
+        """
+        from repositories.v_1.search_repo import SearchRepo
+
+        snapshot_file = current_app.config.get('AUTOCOMPLETE_SNAPSHOT_FILE')
+        if snapshot_file:
+            hits = cls.read_snapshot(snapshot_file)
+        else:
+            hits = scan(
+                SearchRepo.get_es_client(),
+                index=CommonValues.ES_TRAVEL_INDEX,
+                query={"query": {"match_all": {}}}
+            )
+        return AutocompleteIndex(hits)
+
+    @classmethod
+    def refresh_index(cls, app):
+        """
+        Keeps rebuilding the index, runs in a daemon thread of the worker.
+        """
+        with app.app_context():
+            refresh_interval = app.config.get('AUTOCOMPLETE_REFRESH_INTERVAL', cls.DEFAULT_REFRESH_INTERVAL)
+            while True:
+                try:
+                    cls._index = cls.build_index()
+                except Exception as e:
+                    app.logger.error('Unable to build autocomplete index: %s', e)
+                time.sleep(refresh_interval)
+
+    @classmethod
+    def get_index(cls):
+        """
+        Returns the index of current worker, starting its loader on first call.
+
+        Returns None until the first build is complete so callers can fall back to ES.
+
+        :rtype: AutocompleteIndex
+        """
+        if cls._loader is None or cls._loader_pid != os.getpid():
+            with cls._loader_lock:
+                if cls._loader is None or cls._loader_pid != os.getpid():
+                    cls._index = None
+                    cls._loader_pid = os.getpid()
+                    cls._loader = threading.Thread(
+                        target=cls.refresh_index,
+                        args=(current_app._get_current_object(),),
+                        name='autocomplete-index-loader',
+                        daemon=True
+                    )
+                    cls._loader.start()
+        return cls._index
+
+    @classmethod
+    def get_loaded_index(cls):
+        """
+        Returns the index of current worker if it has been loaded, without starting its loader.
+
+        :rtype: AutocompleteIndex
+        """
+        if cls._loader_pid != os.getpid():
+            return None
+        return cls._index
+
+    @classmethod
+    def search(cls, query, lat, lng):
+        """
+        Searches the in-process index.
+
+        :param str query: text typed by the user.
+        :param float lat: latitude of user.
+        :param float lng: longitude of user.
+        :return: ES like hits or None if the index is not ready.
+        :rtype: list
+        """
+        index = cls.get_index()
+        if index is None:
+            return None
+        return index.search(
+            query,
+            lat,
+            lng,
+            size=current_app.config.get('AUTOCOMPLETE_RESULTS_SIZE', cls.DEFAULT_RESULTS_SIZE)
+        )
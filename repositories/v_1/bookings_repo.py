@@ -2,8 +2,16 @@
 Bookings Repo module contains all the bookings specific implementation and helper methods.
 """
 import base64
+import binascii
 import collections
+import copy
 import datetime
+import time
+from bisect import bisect_right
+from functools import lru_cache
+from heapq import merge
+from operator import itemgetter
+from types import MappingProxyType
 
 from flask import current_app
 from werkzeug.exceptions import Forbidden, UnprocessableEntity
@@ -13,6 +21,55 @@ from common.constants.values import StarCategories, URLs
 from models.customer_order import CustomerOrder
 from models.hb_order import HbOrder
 from models.hb_order_status import HbOrderStatus
+from repositories.v_1.cache_repo import TTLCache
+from repositories.v_1.concurrency_repo import TaskGraph
+from repositories.v_1.customer_state_repo import CustomerStateRepo
+
+Room = collections.namedtuple('Room', ['adults', 'children', 'children_ages'])
+ParsedRooms = collections.namedtuple(
+    'ParsedRooms',
+    ['rooms', 'number_of_guests', 'number_of_children', 'children_ages', 'rooms_data']
+)
+
+
+class BookingRow(object):
+    """
+    Compact view of a booking of any source with the fields its booking card needs.
+
+    Fields are copied out of the booking so rows stay usable once the session which loaded the booking is removed.
+    """
+    __slots__ = (
+        'order_id', 'order_number', 'order_currency', 'lat', 'lng', 'image_url', 'telephone', 'number_of_rooms',
+        'room_type', 'sub_title', 'check_in_date', 'check_out_date', 'hotel_id', 'banner_label', 'completed_label',
+        'star_rating', 'name', 'hotel_deep_link', 'web_view_url', 'is_cancelled', 'is_confirmed', 'has_actions'
+    )
+
+    def __init__(
+        self, booking, hotel_id, banner_label, completed_label, star_rating, name, hotel_deep_link, web_view_url,
+        is_cancelled, is_confirmed, has_actions
+    ):
+        self.order_id = booking.id
+        self.order_number = booking.order_number
+        self.order_currency = booking.order_currency
+        self.lat = booking.lat
+        self.lng = booking.lng
+        self.image_url = booking.photo_retina_url
+        self.telephone = booking.telephone
+        self.number_of_rooms = booking.number_of_rooms
+        self.room_type = booking.room_type
+        self.sub_title = ", ".join(filter(None, [booking.city_name, booking.country_name]))
+        self.check_in_date = booking.checkin_date
+        self.check_out_date = booking.checkout_date
+        self.hotel_id = hotel_id
+        self.banner_label = banner_label
+        self.completed_label = completed_label
+        self.star_rating = star_rating
+        self.name = name
+        self.hotel_deep_link = hotel_deep_link
+        self.web_view_url = web_view_url
+        self.is_cancelled = is_cancelled
+        self.is_confirmed = is_confirmed
+        self.has_actions = has_actions
 
 
 class BookingsRepo(object):
@@ -36,263 +93,546 @@ class BookingsRepo(object):
     MAX_ROOM_ADULT_COUNT = 2
     MAX_ROOM_CHILD_AGE = 17
 
+    SOURCE_HWW = 'hww'
+    SOURCE_GETAWAYS = 'getaways'
+    BOOKING_SOURCES = (SOURCE_HWW, SOURCE_GETAWAYS)
+    INVALID_CURSOR_MSG = 'The cursor {cursor} is invalid.'
+    SECTION_UPCOMING = 'upcoming'
+    SECTION_PREVIOUS = 'previous'
+    BOOKING_SECTIONS = (SECTION_UPCOMING, SECTION_PREVIOUS)
+    INVALID_SECTION_MSG = 'The section {section} is invalid.'
+    SECTION_CURSOR_MISMATCH_MSG = 'Cursor of {cursor_section} bookings can not be used to page {section} bookings.'
+    AMBIGUOUS_CURSORS_MSG = 'Bookings are paged one section at a time, pass the section to page.'
+
+    BOOKINGS_CACHE_TTL = 10 * 60
+    # Only first pages having up to `CACHED_PAGE_MAX_BOOKINGS` bookings per section are cached so an entry holds a
+    # couple of dozen booking cards at most.
+    CACHED_PAGE_MAX_BOOKINGS = 10
+    bookings_cache = TTLCache(maxsize=5000, ttl=BOOKINGS_CACHE_TTL, name='customer_bookings')
+    # Generations outlive the cached bookings so bookings cached before an order change never become reachable again.
+    bookings_generations = TTLCache(maxsize=200000, ttl=2 * BOOKINGS_CACHE_TTL, name='customer_bookings_generations')
+
+    # Colors and static texts of every booking card.
+    BOOKING_CARD_STYLE = MappingProxyType({
+        "check_in_label_color": Colors.LIGHT_GREY,
+        "check_in_date_label_color": Colors.DARK_GREY,
+        "check_in_text_color": Colors.DARK_GREY,
+        "check_in_day_label_color": Colors.DARK_GREY,
+        "check_in_label": "Check-in: ",
+        "check_out_label_color": Colors.LIGHT_GREY,
+        "check_out_date_label_color": Colors.DARK_GREY,
+        "check_out_text_color": Colors.DARK_GREY,
+        "check_out_day_label_color": Colors.DARK_GREY,
+        "check_out_label": "Check-out: ",
+        "sub_title_color": Colors.DARK_GREY
+    })
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def get_check_in_labels(check_in_date):
+        """
+        Returns the check-in date labels of a booking card, labels are rendered once per date.
+
+        :param date check_in_date: check-in date of booking.
+        :rtype: MappingProxyType
+        """
+        return MappingProxyType({
+            "check_in_date": check_in_date.strftime("%d-%m-%Y"),
+            "check_in_text": check_in_date.strftime("%b %d, %a"),
+            "check_in_date_label": check_in_date.strftime("%b %d"),
+            "check_in_day_label": check_in_date.strftime("%A"),
+            "month_title_label": check_in_date.strftime("%b")
+        })
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def get_check_out_labels(check_out_date):
+        """
+        Returns the check-out date labels of a booking card, labels are rendered once per date.
+
+        :param date check_out_date: check-out date of booking.
+        :rtype: MappingProxyType
+        """
+        return MappingProxyType({
+            "check_out_date": check_out_date.strftime("%d-%m-%Y"),
+            "check_out_text": check_out_date.strftime("%b %d, %a"),
+            "check_out_date_label": check_out_date.strftime("%b %d"),
+            "check_out_day_label": check_out_date.strftime("%A")
+        })
+
+    @staticmethod
+    def get_today():
+        """
+        Returns today's date in UTC, against which bookings are classified in previous/upcoming sections.
+
+        :rtype: date
+        """
+        return datetime.datetime.utcnow().date()
+
+    @staticmethod
+    def get_hww_booking_name(booking):
+        """
+        Returns hotel name of the HWW booking, falling back to the outlet name without its area.
+
+        :rtype: str
+        """
+        if booking.hotel:
+            return booking.hotel
+        if booking.outlet_name:
+            hotel_name = booking.outlet_name
+            if '-' in hotel_name:
+                hotel_name = hotel_name.split('-')[0].strip()
+            return hotel_name
+        return ''
+
+    @staticmethod
+    def get_hww_booking_star_rating(booking):
+        """
+        Returns the first valid star category of the HWW booking.
+
+        :rtype: str
+        """
+        if booking.sub_categories:
+            for category in booking.sub_categories.split(','):
+                if category in StarCategories.VALID_CATEGORIES:
+                    return category
+        return ''
+
     @classmethod
-    def get_hww_bookings(cls, customer_id, locale):
+    def adapt_hww_booking(cls, booking):
+        """
+        Adapts a HWW booking (CustomerOrder) to a booking row.
 
-        hww_previous_bookings, hww_upcoming_bookings = [], []
-        hww_module_id = current_app.config.get('HWW_MODULE_ID')
+        :rtype: BookingRow
+        """
+        is_cancelled = booking.order_status in (CustomerOrder.ORDER_CANCELLED, CustomerOrder.ORDER_REFUNDED)
+        web_view_url = ''
+        if booking.order_number and booking.platform:
+            web_view_url = current_app.config.get(
+                'BOOKING_CANCEL_URL' if is_cancelled else 'BOOKING_SUCCESS_URL'
+            ).format(
+                order_number=base64.b64encode(bytes(booking.order_number, 'utf-8')).decode("utf-8"),
+                platform=base64.b64encode(bytes(booking.platform, 'utf-8')).decode("utf-8")
+            )
 
-        all_bookings = CustomerOrder.get_customer_hotel_bookings(customer_id, locale, hww_module_id)
-        for booking in all_bookings:
-            check_in_date = booking.checkin_date
-            check_out_date = booking.checkout_date
-            if check_in_date and check_out_date:
-                current_date = datetime.datetime.utcnow().date()
-                is_previous_booking = (check_out_date + datetime.timedelta(days=1)) <= current_date
-
-                booking_info = {
-                    "sort_date": check_in_date,
-                    "lat": booking.lat,
-                    "lng": booking.lng,
-                    "img_url": booking.photo_retina_url,
-                    "order_currency": booking.order_currency,
-                    "order_number": booking.order_number,
-                    "mobile_phone": booking.telephone,
-                    "image_URL": booking.photo_retina_url,
-                    "order_id": booking.id,
-                    "hotel_id": booking.outlet_id,
-                    "banner_label": booking.order_status.title(),
-                    "rooms": {
-                        "number_of_rooms": booking.number_of_rooms,
-                        "room_type": booking.room_type
-                    },
-                    "hotel_deep_link": URLs.BOOKING_HOTEL_DETAILS_DEEP_LINK.format(
-                        merchant_id=booking.merchant_id,
-                        outlet_id=booking.outlet_id
-                    ),
-                    "name": '',
-                    "sub_title": '',
-                    "star_rating": '',
-                    "show_book_again_button": False,
-                    "user_booking_web_view_url": '',
-                    "is_cancelled": False,
-                    "show_booking_banner": True,
-                    "banner_color": ''
-                }
-                sub_title = ", ".join(filter(None, [booking.city_name, booking.country_name]))
-                booking_info['sub_title'] = sub_title
-
-                if booking.order_status in (CustomerOrder.ORDER_CANCELLED, CustomerOrder.ORDER_REFUNDED):
-                    booking_info.update({
-                        "is_cancelled": True,
-                        "banner_color": Colors.BRIGHT_RED,
-                    })
-                elif booking.order_status == CustomerOrder.ORDER_CONFIRMED:
-                    if is_previous_booking:
-                        booking_info['banner_label'] = CustomerOrder.ORDER_COMPLETED.title()
-                    booking_info['banner_color'] = Colors.GREEN
-
-                if booking.hotel:
-                    booking_info['name'] = booking.hotel
-                elif booking.outlet_name:
-                    hotel_name = booking.outlet_name
-                    if '-' in hotel_name:
-                        hotel_name = hotel_name.split('-')[0].strip()
-                    booking_info['name'] = hotel_name
-
-                if booking.sub_categories:
-                    sub_categories = [
-                        category for category in booking.sub_categories.split(',')
-                        if category in StarCategories.VALID_CATEGORIES
-                    ]
-                    if sub_categories:
-                        booking_info['star_rating'] = sub_categories[0]
-
-                if booking.order_number and booking.platform:
-                    b64_order_number = base64.b64encode(bytes(booking.order_number, 'utf-8')).decode("utf-8")
-                    b64_platform = base64.b64encode(bytes(booking.platform, 'utf-8')).decode("utf-8")
-                    if booking_info['is_cancelled']:
-                        booking_info['user_booking_web_view_url'] = (
-                            current_app.config.get('BOOKING_CANCEL_URL').format(
-                                order_number=b64_order_number,
-                                platform=b64_platform
-                            )
-                        )
-                    else:
-                        booking_info['user_booking_web_view_url'] = (
-                            current_app.config.get('BOOKING_SUCCESS_URL').format(
-                                order_number=b64_order_number,
-                                platform=b64_platform
-                            )
-                        )
+        return BookingRow(
+            booking=booking,
+            hotel_id=booking.outlet_id,
+            banner_label=booking.order_status.title(),
+            completed_label=CustomerOrder.ORDER_COMPLETED.title(),
+            star_rating=cls.get_hww_booking_star_rating(booking),
+            name=cls.get_hww_booking_name(booking),
+            hotel_deep_link=URLs.BOOKING_HOTEL_DETAILS_DEEP_LINK.format(
+                merchant_id=booking.merchant_id,
+                outlet_id=booking.outlet_id
+            ),
+            web_view_url=web_view_url,
+            is_cancelled=is_cancelled,
+            is_confirmed=booking.order_status == CustomerOrder.ORDER_CONFIRMED,
+            has_actions=True
+        )
 
-                # Date information update.
-                booking_info.update({
-                    "check_in_date": check_in_date.strftime("%d-%m-%Y"),
-                    "check_in_text": check_in_date.strftime("%b %d, %a"),
-                    "check_in_date_label": check_in_date.strftime("%b %d"),
-                    "check_in_day_label": check_in_date.strftime("%A"),
-                    "month_title_label": check_in_date.strftime("%b"),
-                    "check_out_date": check_out_date.strftime("%d-%m-%Y"),
-                    "check_out_text": check_out_date.strftime("%b %d, %a"),
-                    "check_out_date_label": check_out_date.strftime("%b %d"),
-                    "check_out_day_label": check_out_date.strftime("%A")
-                })
-
-                # Colors and static texts update.
-                booking_info.update({
-                    "check_in_label_color": Colors.LIGHT_GREY,
-                    "check_in_date_label_color": Colors.DARK_GREY,
-                    "check_in_text_color": Colors.DARK_GREY,
-                    "check_in_day_label_color": Colors.DARK_GREY,
-                    "check_in_label": "Check-in: ",
-                    "check_out_label_color": Colors.LIGHT_GREY,
-                    "check_out_date_label_color": Colors.DARK_GREY,
-                    "check_out_text_color": Colors.DARK_GREY,
-                    "check_out_day_label_color": Colors.DARK_GREY,
-                    "check_out_label": "Check-out: ",
-                    "sub_title_color": Colors.DARK_GREY
-
-                })
-                if is_previous_booking:
-                    booking_info["show_book_again_button"] = True
-                    booking_info['action_label'] = cls.BOOK_AGAIN_LABEL
-                    hww_previous_bookings.append(booking_info)
-                else:
-                    booking_info['action_label'] = cls.BOOKING_DETAILS_LABEL
-                    hww_upcoming_bookings.append(booking_info)
+    @staticmethod
+    def adapt_getaways_booking(booking):
+        """
+        Adapts a getaways booking (HbOrder) to a booking row.
 
-        return hww_previous_bookings, hww_upcoming_bookings
+        :rtype: BookingRow
+        """
+        return BookingRow(
+            booking=booking,
+            hotel_id=booking.hotel_id,
+            banner_label=booking.order_status_label,
+            completed_label='Completed',
+            star_rating=booking.star_rating,
+            name=booking.hotel_name,
+            hotel_deep_link=None,
+            web_view_url='',
+            is_cancelled=bool(booking.is_cancelled and booking.order_status == HbOrderStatus.CANCELLED),
+            is_confirmed=booking.order_status == HbOrderStatus.CONFIRMED,
+            has_actions=False
+        )
 
     @classmethod
-    def get_getaways_bookings(cls, customer_id):
+    def build_booking_card(cls, row, is_previous_booking):
+        """
+        Builds the booking card of a booking row.
 
-        gtwys_previous_bookings, gtwys_upcoming_bookings = [], []
+        :param BookingRow row: booking adapted from any source.
+        :param bool is_previous_booking: whether the booking is already checked out.
+        :rtype: dict
+        """
+        banner_label, banner_color = row.banner_label, ''
+        if row.is_cancelled:
+            banner_color = Colors.BRIGHT_RED
+        elif row.is_confirmed:
+            if is_previous_booking:
+                banner_label = row.completed_label
+            banner_color = Colors.GREEN
+
+        booking_info = {
+            "lat": row.lat,
+            "lng": row.lng,
+            "img_url": row.image_url,
+            "order_currency": row.order_currency,
+            "order_number": row.order_number,
+            "mobile_phone": row.telephone,
+            "image_URL": row.image_url,
+            "order_id": row.order_id,
+            "hotel_id": row.hotel_id,
+            "banner_label": banner_label,
+            "rooms": {
+                "number_of_rooms": row.number_of_rooms,
+                "room_type": row.room_type
+            },
+            "name": row.name,
+            "sub_title": row.sub_title,
+            "star_rating": row.star_rating,
+            "show_book_again_button": row.has_actions and is_previous_booking,
+            "user_booking_web_view_url": row.web_view_url,
+            "is_cancelled": row.is_cancelled,
+            "show_booking_banner": True,
+            "banner_color": banner_color,
+            **cls.get_check_in_labels(row.check_in_date),
+            **cls.get_check_out_labels(row.check_out_date),
+            **cls.BOOKING_CARD_STYLE
+        }
+        if row.hotel_deep_link is not None:
+            booking_info['hotel_deep_link'] = row.hotel_deep_link
+        if row.has_actions:
+            booking_info['action_label'] = cls.BOOK_AGAIN_LABEL if is_previous_booking else cls.BOOKING_DETAILS_LABEL
+        return booking_info
 
-        all_bookings = HbOrder.get_customer_getaways_bookings(customer_id=customer_id)
-        for booking in all_bookings:
-            check_in_date = booking.checkin_date
-            check_out_date = booking.checkout_date
-            if check_in_date and check_out_date:
-                current_date = datetime.datetime.utcnow().date()
-                is_previous_booking = (check_out_date + datetime.timedelta(days=1)) <= current_date
-
-                booking_info = {
-                    "sort_date": check_in_date,
-                    "lat": booking.lat,
-                    "lng": booking.lng,
-                    "img_url": booking.photo_retina_url,
-                    "order_currency": booking.order_currency,
-                    "order_number": booking.order_number,
-                    "mobile_phone": booking.telephone,
-                    "image_URL": booking.photo_retina_url,
-                    "order_id": booking.id,
-                    "hotel_id": booking.hotel_id,
-                    "banner_label": booking.order_status_label,
-                    "star_rating": booking.star_rating,
-                    "rooms": {
-                        "number_of_rooms": booking.number_of_rooms,
-                        "room_type": booking.room_type
-                    },
-                    "name": booking.hotel_name,
-                    "sub_title": '',
-                    "show_book_again_button": False,
-                    "user_booking_web_view_url": '',
-                    "is_cancelled": False,
-                    "show_booking_banner": True,
-                    "banner_color": ''
-                }
-                sub_title = ", ".join(filter(None, [booking.city_name, booking.country_name]))
-                booking_info['sub_title'] = sub_title
-
-                if booking.is_cancelled and booking.order_status == HbOrderStatus.CANCELLED:
-                    booking_info.update({
-                        "is_cancelled": True,
-                        "banner_color": Colors.BRIGHT_RED,
-                    })
-                elif booking.order_status == HbOrderStatus.CONFIRMED:
-                    if is_previous_booking:
-                        booking_info['banner_label'] = 'Completed'
-                    booking_info['banner_color'] = Colors.GREEN
-
-                # Date information update.
-                booking_info.update({
-                    "check_in_date": check_in_date.strftime("%d-%m-%Y"),
-                    "check_in_text": check_in_date.strftime("%b %d, %a"),
-                    "check_in_date_label": check_in_date.strftime("%b %d"),
-                    "check_in_day_label": check_in_date.strftime("%A"),
-                    "month_title_label": check_in_date.strftime("%b"),
-                    "check_out_date": check_out_date.strftime("%d-%m-%Y"),
-                    "check_out_text": check_out_date.strftime("%b %d, %a"),
-                    "check_out_date_label": check_out_date.strftime("%b %d"),
-                    "check_out_day_label": check_out_date.strftime("%A")
-                })
-
-                # Colors and static texts update.
-                booking_info.update({
-                    "check_in_label_color": Colors.LIGHT_GREY,
-                    "check_in_date_label_color": Colors.DARK_GREY,
-                    "check_in_text_color": Colors.DARK_GREY,
-                    "check_in_day_label_color": Colors.DARK_GREY,
-                    "check_in_label": "Check-in: ",
-                    "check_out_label_color": Colors.LIGHT_GREY,
-                    "check_out_date_label_color": Colors.DARK_GREY,
-                    "check_out_text_color": Colors.DARK_GREY,
-                    "check_out_day_label_color": Colors.DARK_GREY,
-                    "check_out_label": "Check-out: ",
-                    "sub_title_color": Colors.DARK_GREY
-
-                })
-                if is_previous_booking:
-                    gtwys_previous_bookings.append(booking_info)
+    @classmethod
+    def classify_bookings(cls, bookings, adapt_booking, today=None):
+        """
+        Adapts bookings of a source to booking rows and classifies them in previous/upcoming bookings.
+
+        Bookings without check-in or check-out dates are skipped. A booking is previous once a day has passed since
+        its check-out date.
+
+        :param bookings: bookings of a single source.
+        :param adapt_booking: callable adapting a booking of the source to a booking row.
+        :param date today: today's date, computed if not passed.
+        :rtype: tuple
+        """
+        previous_bookings, upcoming_bookings = [], []
+        last_checked_out_date = (today or cls.get_today()) - datetime.timedelta(days=1)
+        for booking in bookings:
+            if booking.checkin_date and booking.checkout_date:
+                if booking.checkout_date <= last_checked_out_date:
+                    previous_bookings.append(adapt_booking(booking))
                 else:
-                    gtwys_upcoming_bookings.append(booking_info)
+                    upcoming_bookings.append(adapt_booking(booking))
+
+        return previous_bookings, upcoming_bookings
+
+    @classmethod
+    def get_hww_bookings(cls, customer_id, locale, today=None):
+        """
+        Gets HWW bookings of the customer classified in previous/upcoming bookings.
+
+        :rtype: tuple
+        """
+        hww_module_id = current_app.config.get('HWW_MODULE_ID')
+        all_bookings = CustomerOrder.get_customer_hotel_bookings(customer_id, locale, hww_module_id)
+        return cls.classify_bookings(all_bookings, cls.adapt_hww_booking, today)
 
-        return gtwys_previous_bookings, gtwys_upcoming_bookings
+    @classmethod
+    def get_getaways_bookings(cls, customer_id, today=None):
+        """
+        Gets getaways bookings of the customer classified in previous/upcoming bookings.
 
-    def get_user_previous_and_upcoming_bookings(self, customer_id, locale):
+        :rtype: tuple
+        """
+        all_bookings = HbOrder.get_customer_getaways_bookings(customer_id=customer_id)
+        return cls.classify_bookings(all_bookings, cls.adapt_getaways_booking, today)
+
+    def get_user_previous_and_upcoming_bookings(
+        self, customer_id, locale, limit=0, upcoming_cursor=None, previous_cursor=None, section=None
+    ):
         """
         Gets users all booking requests and classifies them in previous/upcoming sections.
 
-        NOTE: Removed order_by from queries since now we are also getting getaways bookings and reordering them.
+        Sections are paginated on check-in date, source and order id: a page starts right after its cursor and the
+        cursor of next page is returned if there are more bookings in the section. First page of both sections is
+        returned together and read from the cache, later pages are requested for a single section so a section having
+        no more pages is never sent again. A cursor sent without the section pages the section it belongs to.
 
         :param int customer_id: The id of customer for which we need to get bookings.
         :param str locale: locale of the user.
+        :param int limit: maximum bookings in every section, all bookings are returned if it is zero.
+        :param str upcoming_cursor: cursor of the page of upcoming bookings.
+        :param str previous_cursor: cursor of the page of previous bookings.
+        :param str section: the only section to return, both sections are returned if it is not passed.
+        :raises UnprocessableEntity: in case the section is invalid or a cursor doesn't belong to the section.
+        :return: upcoming bookings, previous bookings and cursors of next pages of the returned sections.
         :rtype: tuple
         """
-        upcoming_bookings = []
-        previous_bookings = []
+        section = self.get_paged_section(section, upcoming_cursor, previous_cursor)
+        if upcoming_cursor or previous_cursor:
+            pages = self.get_bookings_pages(
+                customer_id,
+                locale,
+                self.get_today(),
+                limit=limit,
+                cursor=upcoming_cursor or previous_cursor,
+                sections=(section,)
+            )
+        else:
+            pages = self.get_first_bookings_pages(customer_id, locale, limit)
+        upcoming_page, previous_page, next_cursors = pages
 
-        hww_prev, hww_upcoming = self.get_hww_bookings(customer_id=customer_id, locale=locale)
-        if hww_prev:
-            previous_bookings.extend(hww_prev)
-        if hww_upcoming:
-            upcoming_bookings.extend(hww_upcoming)
+        if section == self.SECTION_UPCOMING:
+            return upcoming_page, [], {self.SECTION_UPCOMING: next_cursors[self.SECTION_UPCOMING]}
+        if section == self.SECTION_PREVIOUS:
+            return [], previous_page, {self.SECTION_PREVIOUS: next_cursors[self.SECTION_PREVIOUS]}
+        return upcoming_page, previous_page, next_cursors
+
+    @classmethod
+    def get_paged_section(cls, section, upcoming_cursor, previous_cursor):
+        """
+        Returns the section to page, i.e. the passed section or else the section whose cursor is passed.
 
-        gtwys_prev, gtwys_upcoming = self.get_getaways_bookings(customer_id=customer_id)
-        if gtwys_prev:
-            previous_bookings.extend(gtwys_prev)
-        if gtwys_upcoming:
-            upcoming_bookings.extend(gtwys_upcoming)
+        :raises UnprocessableEntity: in case the section is invalid, cursors of both sections are passed without the
+                                     section or the cursor of the other section is passed.
+        :rtype: str
+        """
+        if section and section not in cls.BOOKING_SECTIONS:
+            raise UnprocessableEntity(cls.INVALID_SECTION_MSG.format(section=section))
+
+        section_cursors = ((cls.SECTION_UPCOMING, upcoming_cursor), (cls.SECTION_PREVIOUS, previous_cursor))
+        cursor_sections = [cursor_section for cursor_section, cursor in section_cursors if cursor]
+        if not section:
+            if len(cursor_sections) > 1:
+                raise UnprocessableEntity(cls.AMBIGUOUS_CURSORS_MSG)
+            return cursor_sections[0] if cursor_sections else section
+
+        for cursor_section in cursor_sections:
+            if cursor_section != section:
+                raise UnprocessableEntity(
+                    cls.SECTION_CURSOR_MISMATCH_MSG.format(cursor_section=cursor_section, section=section)
+                )
+        return section
 
-        if previous_bookings:
-            previous_bookings = self._sort_bookings(previous_bookings, is_reverse=True)
-        if upcoming_bookings:
-            upcoming_bookings = self._sort_bookings(upcoming_bookings)
+    @classmethod
+    def get_first_bookings_pages(cls, customer_id, locale, limit):
+        """
+        Gets the first pages of upcoming and previous bookings of the customer, reading them from the cache.
 
+        Pages are cached against customer, locale, today's date and limit so bookings move from upcoming to previous
+        section at midnight UTC, only pages having up to `CACHED_PAGE_MAX_BOOKINGS` bookings per section are cached.
+        Changing an order of the customer bumps the generation of customer's bookings which leaves the cached pages
+        unreachable. Every call gets its own copy of the cached pages.
+
+        :param int customer_id: The id of customer for which we need to get bookings.
+        :param str locale: locale of the user.
+        :param int limit: maximum bookings in every section, all bookings are returned if it is zero.
+        :rtype: tuple
+        """
+        today = cls.get_today()
+        cache_key = (customer_id, cls.bookings_generations.get(customer_id, 0), locale, today, limit)
+        pages = cls.bookings_cache.get(cache_key)
+        if pages is None:
+            pages = cls.get_bookings_pages(customer_id, locale, today, limit=limit)
+            upcoming_page, previous_page, _ = pages
+            if max(len(upcoming_page), len(previous_page)) <= cls.CACHED_PAGE_MAX_BOOKINGS:
+                cls.bookings_cache.set(
+                    cache_key,
+                    pages,
+                    ttl=current_app.config.get('BOOKINGS_CACHE_TTL', cls.BOOKINGS_CACHE_TTL)
+                )
+        return copy.deepcopy(pages)
+
+    @classmethod
+    def get_bookings_pages(cls, customer_id, locale, today, limit=0, cursor=None, sections=BOOKING_SECTIONS):
+        """
+        Gets the pages of bookings of the passed sections of the customer starting after the cursor.
+
+        The order models return all bookings of the customer so every booking is fetched and sorted, but booking cards
+        are only built for the bookings of the pages.
+
+        :param int customer_id: The id of customer for which we need to get bookings.
+        :param str locale: locale of the user.
+        :param date today: today's date against which bookings are classified.
+        :param int limit: maximum bookings in every section, all bookings are returned if it is zero.
+        :param str cursor: cursor of the page, only to be passed along with a single section.
+        :param tuple sections: sections to page.
+        :return: upcoming bookings, previous bookings and cursors of next pages of the passed sections.
+        :rtype: tuple
+        """
+        upcoming_bookings, previous_bookings = cls.get_sorted_bookings(customer_id, locale, today, sections)
+        upcoming_page, previous_page, next_cursors = [], [], {}
+        if cls.SECTION_UPCOMING in sections:
+            upcoming_page, next_cursors[cls.SECTION_UPCOMING] = cls._paginate_bookings(
+                upcoming_bookings,
+                limit=limit,
+                cursor=cursor
+            )
+        if cls.SECTION_PREVIOUS in sections:
+            previous_page, next_cursors[cls.SECTION_PREVIOUS] = cls._paginate_bookings(
+                previous_bookings,
+                limit=limit,
+                cursor=cursor,
+                is_reverse=True
+            )
+        return upcoming_page, previous_page, next_cursors
+
+    @classmethod
+    def invalidate_customer_bookings(cls, customer_id):
+        """
+        Drops the cached bookings and bookings state of the customer.
+
+        To be called by every API changing orders of the customer. Orders are also changed by other services and
+        only the caches of current worker are dropped, bookings cached elsewhere are refreshed within
+        `BOOKINGS_CACHE_TTL` seconds.
+
+        :param int customer_id: ID of customer.
+        """
+        cls.bookings_generations.set(
+            customer_id,
+            time.monotonic(),
+            ttl=2 * current_app.config.get('BOOKINGS_CACHE_TTL', cls.BOOKINGS_CACHE_TTL)
+        )
+        CustomerStateRepo.invalidate_bookings(customer_id)
+
+    @classmethod
+    def get_bookings_cache_stats(cls):
+        """
+        Returns hit/miss counters of the bookings cache.
+
+        :rtype: dict
+        """
+        return cls.bookings_cache.stats
+
+    @classmethod
+    def get_sorted_bookings(cls, customer_id, locale, today, sections=BOOKING_SECTIONS):
+        """
+        Gets the upcoming and previous booking rows of the customer, each ordered on their sort key.
+
+        HWW and getaways bookings live in different databases so they are fetched concurrently, bookings of every
+        source are ordered on their check-in date and then both sources are merged in a single pass. Only the passed
+        sections are sorted, the other one is left empty.
+
+        :rtype: tuple
+        """
+        task_graph = TaskGraph()
+        task_graph.add(cls.SOURCE_HWW, cls.get_hww_bookings, customer_id=customer_id, locale=locale, today=today)
+        task_graph.add(cls.SOURCE_GETAWAYS, cls.get_getaways_bookings, customer_id=customer_id, today=today)
+        results = task_graph.run()
+        for error in task_graph.errors.values():
+            if isinstance(error, Exception):
+                raise error
+
+        hww_prev, hww_upcoming = results[cls.SOURCE_HWW]
+        gtwys_prev, gtwys_upcoming = results[cls.SOURCE_GETAWAYS]
+
+        upcoming_bookings = previous_bookings = ([], [])
+        if cls.SECTION_UPCOMING in sections:
+            upcoming_bookings = cls._merge_bookings(
+                ((cls.SOURCE_HWW, hww_upcoming), (cls.SOURCE_GETAWAYS, gtwys_upcoming))
+            )
+        if cls.SECTION_PREVIOUS in sections:
+            previous_bookings = cls._merge_bookings(
+                ((cls.SOURCE_HWW, hww_prev), (cls.SOURCE_GETAWAYS, gtwys_prev)),
+                is_reverse=True
+            )
         return upcoming_bookings, previous_bookings
 
+    @classmethod
+    def get_sort_key(cls, sort_date, source, order_id, is_reverse=False):
+        """
+        Returns the key on which bookings are ordered, latest check-in date comes first in case of reverse order.
+
+        :rtype: tuple
+        """
+        return (
+            -sort_date.toordinal() if is_reverse else sort_date.toordinal(),
+            cls.BOOKING_SOURCES.index(source),
+            order_id
+        )
+
     @staticmethod
-    def _sort_bookings(bookings, is_reverse=False):
+    def encode_cursor(sort_date, source, order_id):
         """
-        Sorts booking based on temporary date field added for sorting and then deletes the date field for
-        JSON serialization.
+        Encodes the position of a booking in a cursor.
+
+        :rtype: str
         """
-        bookings.sort(key=lambda _: _['sort_date'], reverse=is_reverse)
-        for booking in bookings:
-            del booking['sort_date']
+        cursor = '{sort_date}:{source}:{order_id}'.format(
+            sort_date=sort_date.isoformat(),
+            source=source,
+            order_id=order_id
+        )
+        return base64.urlsafe_b64encode(bytes(cursor, 'utf-8')).decode('utf-8')
+
+    @classmethod
+    def decode_cursor(cls, cursor):
+        """
+        Decodes the position of a booking from the cursor.
 
-        return bookings
+        :rtype: tuple
+        """
+        try:
+            sort_date, source, order_id = base64.urlsafe_b64decode(bytes(cursor, 'utf-8')).decode('utf-8').split(':')
+            sort_date = datetime.datetime.strptime(sort_date, '%Y-%m-%d').date()
+            order_id = int(order_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise UnprocessableEntity(cls.INVALID_CURSOR_MSG.format(cursor=cursor))
+        if source not in cls.BOOKING_SOURCES:
+            raise UnprocessableEntity(cls.INVALID_CURSOR_MSG.format(cursor=cursor))
+        return sort_date, source, order_id
+
+    @classmethod
+    def _merge_bookings(cls, sources, is_reverse=False):
+        """
+        Sorts booking rows of every source on their check-in date and merges the sorted sources.
+
+        :param tuple sources: pairs of source name and its booking rows.
+        :return: sort keys of the merged booking rows along with their source and row.
+        :rtype: tuple
+        """
+        sorted_sources = []
+        for source, rows in sources:
+            keyed_rows = [
+                (cls.get_sort_key(row.check_in_date, source, row.order_id, is_reverse), source, row) for row in rows
+            ]
+            keyed_rows.sort(key=itemgetter(0))
+            sorted_sources.append(keyed_rows)
+
+        keys, merged_rows = [], []
+        for key, source, row in merge(*sorted_sources, key=itemgetter(0)):
+            keys.append(key)
+            merged_rows.append((source, row))
+        return keys, merged_rows
+
+    @classmethod
+    def _paginate_bookings(cls, sorted_bookings, limit=0, cursor=None, is_reverse=False):
+        """
+        Returns the booking cards of the page of sorted booking rows starting after the cursor.
+
+        Cards are only built for the rows of the page. Previous bookings are sorted in reverse order.
+
+        :param tuple sorted_bookings: sort keys of the booking rows along with their source and row.
+        :param int limit: maximum bookings to return, all bookings are returned if it is zero.
+        :param str cursor: cursor of the booking after which bookings are returned.
+        :return: booking cards and the cursor of next page.
+        :rtype: tuple
+        """
+        keys, merged_rows = sorted_bookings
+        start = 0
+        if cursor:
+            start = bisect_right(keys, cls.get_sort_key(*cls.decode_cursor(cursor), is_reverse=is_reverse))
+
+        end = start + limit if limit else len(merged_rows)
+        next_cursor = None
+        if end < len(merged_rows):
+            source, row = merged_rows[end - 1]
+            next_cursor = cls.encode_cursor(row.check_in_date, source, row.order_id)
+
+        return [
+            cls.build_booking_card(row, is_previous_booking=is_reverse) for _, row in merged_rows[start:end]
+        ], next_cursor
 
     @staticmethod
     def validate_cin_cout_dates(check_in_date, check_out_date):
@@ -328,68 +668,84 @@ class BookingsRepo(object):
         return True
 
     @classmethod
-    def validate_rooms(cls, rooms_params):
+    def get_room_count(cls, room_info, key, max_count, field_name, room_number):
         """
-        Validates the rooms.
-        :param rooms_params: dict of the rooms
+        Returns the validated count of guests of a room.
+
+        :rtype: int
         """
-        rooms = {}
-        mongo_rooms = []
-        for room_index, room_info in enumerate(rooms_params):
-            try:
-                rooms['Room']
-            except KeyError:
-                rooms['Room'] = []
-
-            try:
-                adults_count = int(room_info.get('a', 0))
-                if adults_count > cls.MAX_ROOM_ADULT_COUNT:
-                    raise Forbidden(
-                        "Adult count must be less than {adult_count} for room number {room_number}".format(
-                            adult_count=cls.MAX_ROOM_ADULT_COUNT,
-                            room_number=room_index + 1
-                        )
-                    )
-            except ValueError:
-                raise Forbidden(
-                    "Adult count must be integer for room number {room_number}".format(room_number=room_index + 1)
+        try:
+            count = int(room_info.get(key, 0))
+        except ValueError:
+            raise Forbidden(
+                "{field_name} count must be integer for room number {room_number}".format(
+                    field_name=field_name,
+                    room_number=room_number
                 )
-
-            try:
-                children_count = int(room_info.get('c', 0))
-                if children_count > cls.MAX_ROOM_CHILD_COUNT:
-                    raise Forbidden(
-                        "Children count must be less than {children_count} for room number {room_number}".format(
-                            children_count=cls.MAX_ROOM_CHILD_COUNT,
-                            room_number=room_index + 1
-                        )
-                    )
-            except ValueError:
-                raise Forbidden(
-                    "Children count must be integer for room number {room_number}".format(room_number=room_index + 1)
+            )
+        if count > max_count:
+            raise Forbidden(
+                "{field_name} count must be less than {max_count} for room number {room_number}".format(
+                    field_name=field_name,
+                    max_count=max_count,
+                    room_number=room_number
                 )
+            )
+        return count
 
-            for children_age in room_info.get('c_ages', []):
+    @classmethod
+    def parse_rooms(cls, rooms_params):
+        """
+        Validates the rooms and normalizes them in a single pass.
+
+        :param list rooms_params: rooms with adults count `a`, children count `c` and children ages `c_ages`.
+        :raises Forbidden: in case a count or age is not an integer or is greater than its limit.
+        :rtype: ParsedRooms
+        """
+        rooms = []
+        room_dicts = []
+        children_ages = []
+        number_of_guests = 0
+        number_of_children = 0
+        for room_index, room_info in enumerate(rooms_params):
+            room_number = room_index + 1
+            adults_count = cls.get_room_count(room_info, 'a', cls.MAX_ROOM_ADULT_COUNT, 'Adult', room_number)
+            children_count = cls.get_room_count(room_info, 'c', cls.MAX_ROOM_CHILD_COUNT, 'Children', room_number)
+
+            room_children_ages = room_info.get('c_ages', [])
+            for children_age in room_children_ages:
                 try:
-                    children_ages = int(children_age)
-                    if children_ages > cls.MAX_ROOM_CHILD_AGE:
-                        raise Forbidden(
-                            "Children age must be less than {children_count} for room number {room_number}".format(
-                                children_count=cls.MAX_ROOM_CHILD_AGE,
-                                room_number=room_index + 1
-                            )
-                        )
+                    is_valid_age = int(children_age) <= cls.MAX_ROOM_CHILD_AGE
                 except ValueError:
                     raise Forbidden(
-                        "Children ages must be integer for room number {room_number}".format(room_number=room_index + 1)
+                        "Children ages must be integer for room number {room_number}".format(room_number=room_number)
+                    )
+                if not is_valid_age:
+                    raise Forbidden(
+                        "Children age must be less than {children_count} for room number {room_number}".format(
+                            children_count=cls.MAX_ROOM_CHILD_AGE,
+                            room_number=room_number
+                        )
                     )
 
             single_room = collections.OrderedDict()
             single_room['Adults'] = adults_count
-            if room_info.get('c', 0) and room_info.get('c_ages', []):
+            number_of_guests += adults_count
+            if children_count and room_children_ages:
                 single_room['Children'] = room_info.get('c', 0)
-                single_room['ChildAge'] = room_info.get('c_ages', [])
-            mongo_rooms.append({'Room': single_room})
-            rooms['Room'].append(single_room)
-
-        return rooms, mongo_rooms
+                single_room['ChildAge'] = room_children_ages
+                number_of_children += children_count
+                children_ages.extend(room_children_ages)
+            else:
+                children_count, room_children_ages = 0, []
+
+            rooms.append(Room(adults=adults_count, children=children_count, children_ages=tuple(room_children_ages)))
+            room_dicts.append(single_room)
+
+        return ParsedRooms(
+            rooms=tuple(rooms),
+            number_of_guests=number_of_guests,
+            number_of_children=number_of_children,
+            children_ages=','.join(str(children_age) for children_age in children_ages),
+            rooms_data={'Room': room_dicts} if room_dicts else {}
+        )
@@ -0,0 +1,134 @@
+"""
+Cache Repo module contains the in-process caches shared by the repos and their helper methods.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache(object):
+    """
+    Thread safe, size bounded LRU cache whose entries expire after `ttl` seconds.
+
+    Caches are per worker process; they are meant for data that is cheap to recompute and can be a few minutes stale.
+    Hits, misses and evictions are counted and exposed through `stats`.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, name=''):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._key_locks = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _lookup(self, key):
+        """
+        Returns whether the key is cached along with its value without updating the counters.
+
+        :rtype: tuple
+        """
+        try:
+            expires_at, value = self._data[key]
+        except KeyError:
+            return False, None
+
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return False, None
+
+        self._data.move_to_end(key)
+        return True, value
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value against the key or `default` if it is missing or expired.
+        """
+        with self._lock:
+            is_cached, value = self._lookup(key)
+            if is_cached:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def get_or_set(self, key, compute, ttl=None):
+        """
+        Returns the cached value against the key, computing and caching it on a miss.
+
+        Concurrent misses on the same key are collapsed: only one thread calls `compute` while the others wait for
+        and reuse its value.
+
+        :param key: cache key.
+        :param compute: callable returning the value to be cached.
+        :param ttl: seconds to cache the value for or a callable returning them for the computed value, defaults to
+                    cache's ttl.
+        """
+        with self._lock:
+            is_cached, value = self._lookup(key)
+            if is_cached:
+                self.hits += 1
+                return value
+            self.misses += 1
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                is_cached, value = self._lookup(key)
+            if not is_cached:
+                try:
+                    value = compute()
+                    self.set(key, value, ttl(value) if callable(ttl) else ttl)
+                finally:
+                    with self._lock:
+                        self._key_locks.pop(key, None)
+        return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Caches the value against the key, evicting the least recently used entries if the cache is full.
+        """
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """
+        Removes the key from cache if present.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """
+        Removes all the entries from cache.
+        """
+        with self._lock:
+            self._data.clear()
+
+    @property
+    def stats(self):
+        """
+        Returns hit/miss counters of the cache.
+
+        :rtype: dict
+        """
+        lookups = self.hits + self.misses
+        return {
+            'name': self.name,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,142 @@
+"""
+Concurrency Repo module contains the per-request task graph used to run independent data fetches concurrently.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+
+from flask import (copy_current_request_context, current_app,
+                   has_request_context)
+
+
+class TaskGraph(object):
+    """
+    Runs the tasks of a single request on a shared thread pool as soon as their dependencies are done.
+
+    Every task runs within a copy of the current request (or app) context so Flask, SQLAlchemy and the request
+    environment are available in the worker threads. The DB session of a task is removed when its context is torn
+    down, so tasks must return plain data: ORM instances returned by them are detached and can't load relationships.
+
+    Tasks not done by the deadline, failed tasks and the tasks depending on them are left out of `results`, their
+    reasons are kept in `errors`. Durations of all finished tasks are kept in `durations`.
+    """
+    DEFAULT_MAX_WORKERS = 16
+
+    _executor = None
+    _executor_pid = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, deadline=None, logger=None):
+        """
+        :param float deadline: seconds within which all tasks must be done.
+        :param logger: logger of the API to log failed tasks.
+        """
+        self.deadline = deadline
+        self.logger = logger
+        self.tasks = {}
+        self.results = {}
+        self.errors = {}
+        self.durations = {}
+
+    @classmethod
+    def get_executor(cls):
+        """
+        Returns the thread pool of current worker process, creating it after a fork.
+
+        :rtype: ThreadPoolExecutor
+        """
+        if cls._executor is None or cls._executor_pid != os.getpid():
+            with cls._executor_lock:
+                if cls._executor is None or cls._executor_pid != os.getpid():
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=current_app.config.get('TASK_GRAPH_MAX_WORKERS', cls.DEFAULT_MAX_WORKERS),
+                        thread_name_prefix='task-graph'
+                    )
+                    cls._executor_pid = os.getpid()
+        return cls._executor
+
+    def add(self, name, func, *args, depends_on=(), **kwargs):
+        """
+        Adds a task in the graph.
+
+        :param str name: unique name of the task, its result is kept against it.
+        :param func: callable to run.
+        :param tuple depends_on: names of the tasks which must be done before this task starts.
+        """
+        run_task = partial(self.run_timed, name, func, *args, **kwargs)
+        if has_request_context():
+            run_task = copy_current_request_context(run_task)
+        else:
+            run_task = partial(self.run_in_app_context, current_app._get_current_object(), run_task)
+
+        self.tasks[name] = (run_task, tuple(depends_on))
+        return self
+
+    def run_timed(self, name, func, *args, **kwargs):
+        """
+        Runs the task and records its duration.
+        """
+        started_at = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.durations[name] = time.monotonic() - started_at
+
+    @staticmethod
+    def run_in_app_context(app, run_task):
+        """
+        Runs the task within a new context of the app.
+        """
+        with app.app_context():
+            return run_task()
+
+    def run(self):
+        """
+        Runs all tasks and waits for them till the deadline.
+
+        :return: results of the tasks done successfully.
+        :rtype: dict
+        """
+        executor = self.get_executor()
+        expires_at = None if self.deadline is None else time.monotonic() + self.deadline
+        pending = dict(self.tasks)
+        running = {}
+
+        while pending or running:
+            for name, (run_task, depends_on) in list(pending.items()):
+                if any(dependency in self.errors for dependency in depends_on):
+                    self.errors[name] = 'dependency failed'
+                    del pending[name]
+                elif all(dependency in self.results for dependency in depends_on):
+                    running[executor.submit(run_task)] = name
+                    del pending[name]
+
+            if not running:
+                for name in pending:
+                    self.errors[name] = 'unresolved dependency'
+                break
+
+            timeout = None if expires_at is None else max(0, expires_at - time.monotonic())
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                for future, name in running.items():
+                    future.cancel()
+                    self.errors[name] = 'deadline exceeded'
+                for name in pending:
+                    self.errors[name] = 'deadline exceeded'
+                break
+
+            for future in done:
+                name = running.pop(future)
+                try:
+                    self.results[name] = future.result()
+                except Exception as e:
+                    self.errors[name] = e
+                    if self.logger:
+                        self.logger.exception(e)
+
+        if self.errors and self.logger:
+            self.logger.warning('Tasks not done: %s', {name: str(error) for name, error in self.errors.items()})
+        return self.results
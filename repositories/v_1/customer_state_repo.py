@@ -0,0 +1,62 @@
+"""
+Customer State Repo module contains the per-customer cache of the state deciding the user specific home sections.
+"""
+from repositories.v_1.cache_repo import TTLCache
+
+
+class CustomerStateRepo(object):
+    """
+    Caches whether a customer has bookings and the count of hotels recently viewed by the customer.
+
+    Entries expire after `STATE_TTL` seconds and only the `MAX_CUSTOMERS` most recently used customers are kept. The
+    APIs changing a state i.e. booking inquiry and redemption for bookings, hotel details and clear history for
+    recently viewed hotels drop it right away, but only in the worker serving them: other workers keep their cached
+    state till it expires, so consistency across workers is bound by `STATE_TTL` alone.
+    """
+    STATE_TTL = 10 * 60
+    MAX_CUSTOMERS = 50000
+
+    HAS_BOOKINGS = 'has_bookings'
+    RECENT_HOTELS_COUNT = 'recent_hotels_count'
+
+    # Every customer has one entry per state.
+    state_cache = TTLCache(maxsize=2 * MAX_CUSTOMERS, ttl=STATE_TTL, name='customer_state')
+
+    @classmethod
+    def get_state(cls, customer_id, state):
+        """
+        Gets the cached state of customer.
+
+        :param int customer_id: ID of customer.
+        :param str state: name of the state.
+        :return: cached value or None if it is not cached.
+        """
+        return cls.state_cache.get((state, customer_id))
+
+    @classmethod
+    def set_state(cls, customer_id, state, value):
+        """
+        Caches the state of customer.
+
+        :param int customer_id: ID of customer.
+        :param str state: name of the state.
+        """
+        cls.state_cache.set((state, customer_id), value)
+
+    @classmethod
+    def invalidate_bookings(cls, customer_id):
+        """
+        Drops the cached bookings state of customer.
+
+        :param int customer_id: ID of customer.
+        """
+        cls.state_cache.delete((cls.HAS_BOOKINGS, customer_id))
+
+    @classmethod
+    def invalidate_recent_hotels(cls, customer_id):
+        """
+        Drops the cached recently viewed hotels count of customer.
+
+        :param int customer_id: ID of customer.
+        """
+        cls.state_cache.delete((cls.RECENT_HOTELS_COUNT, customer_id))
@@ -3,6 +3,7 @@ Hww Hotel Details API Repo module contains all the details specific static data,
 """
 import datetime
 import math
+from collections import namedtuple
 
 from flask import current_app
 
@@ -10,7 +11,16 @@ from common.constants.colors import Colors
 from common.constants.icons import Icons
 from common.constants.values import URLs
 from common.utils.api_utils import multi_key_sort
-from models.exchange_rate import ExchangeRate
+from repositories.v_1.exchange_rate_repo import ExchangeRateRepo
+
+HotelPackage = namedtuple(
+    'HotelPackage',
+    [
+        'price', 'currency', 'discounted_price', 'discounted_currency', 'no_of_nights', 'no_of_adults',
+        'no_of_childs', 'short_name', 'room_type_id', 'room_type_title', 'inclusions', 'terms', 'cancellation_notes',
+        'is_best_offer', 'is_2_for_1', 'validity_date'
+    ]
+)
 
 
 class HotelDetailsRepo(object):
@@ -165,36 +175,54 @@ class HotelDetailsRepo(object):
             }
         ]
 
+    @staticmethod
+    def get_packages(outlet_id, merchant_id):
+        """
+        Gets packages of the outlet from DB.
+
+        Packages are copied out of their DB rows so they stay usable once the session which loaded them is removed,
+        e.g. when fetched by a task of `TaskGraph`.
+
+        :param int outlet_id: ID of outlet of the instant booking merchant.
+        :param int merchant_id: ID of instant booking merchant.
+        :rtype: list
+        """
+        from models.package import Package
+        return [
+            HotelPackage(*(getattr(package, field) for field in HotelPackage._fields))
+            for package in Package.get_packages(outlet_id, merchant_id)
+        ]
+
     @classmethod
-    def get_hotel_packages(cls, outlet_id, merchant_id, currency):
+    def get_hotel_packages(cls, outlet_id, merchant_id, currency, packages=None):
         """
         Gets hotel packages from DB in case of Instant Booking.
 
         :param int outlet_id: ID of outlet of the instant booking merchant.
         :param int merchant_id: ID of instant booking merchant.
         :param str currency: Contains currency.
+        :param list packages: packages already fetched from DB, fetched here if not passed.
         :rtype: list
         """
-
-        from models.package import Package
         packages_list = []
 
-        packages = Package.get_packages(outlet_id, merchant_id)
-        for package in packages:
-            total_price = round(
-                ExchangeRate.get_conversion_rate(
-                    price=package.price,
-                    currency_from=package.currency,
-                    currency_to=currency
-                )
-            )
-            discounted_price = round(
-                ExchangeRate.get_conversion_rate(
-                    price=package.discounted_price,
-                    currency_from=package.discounted_currency,
-                    currency_to=currency
-                )
-            )
+        if packages is None:
+            packages = cls.get_packages(outlet_id, merchant_id)
+        converted_prices = ExchangeRateRepo.convert_many(
+            prices=[price for package in packages for price in (package.price, package.discounted_price)],
+            currencies_from=[
+                package_currency
+                for package in packages
+                for package_currency in (package.currency, package.discounted_currency)
+            ],
+            currency_to=currency
+        )
+        for index, package in enumerate(packages):
+            if math.isnan(converted_prices[2 * index]) or math.isnan(converted_prices[2 * index + 1]):
+                # No exchange rate is known for the currency of package so it can't be priced.
+                continue
+            total_price = round(converted_prices[2 * index])
+            discounted_price = round(converted_prices[2 * index + 1])
             percentage_off = int(math.floor(((total_price - discounted_price) / total_price) * 100))
 
             package_type_text = "{p1} nights stay for {p2} adults".format(
@@ -0,0 +1,152 @@
+"""
+Exchange Rate Repo module contains the in-process exchange rate matrix used to price lists of amounts at once.
+"""
+import threading
+import time
+
+import numpy
+from flask import current_app
+
+from models.exchange_rate import ExchangeRate
+
+
+class ExchangeRateMatrix(object):
+    """
+    Conversion rates between currencies of a single version of the exchange rates.
+
+    Rates are read from DB once per currency pair and kept till the matrix is replaced by a newer version, so pricing
+    any number of amounts in known currencies needs no DB round trip. A pair whose rate can't be read for this version
+    keeps the rate known by the previous versions.
+    """
+    # Rates are derived by converting a large amount so rounding done by the model doesn't lose precision.
+    PROBE_AMOUNT = 1000000
+
+    def __init__(self, version, previous=None):
+        """
+        :param int version: version of the exchange rates.
+        :param ExchangeRateMatrix previous: matrix replaced by this one, its rates are used for missing pairs.
+        """
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.rates = {}
+        self.missing_pairs = set()
+        self.previous_rates = {}
+        if previous:
+            self.previous_rates.update(previous.previous_rates)
+            self.previous_rates.update(previous.rates)
+        self._lock = threading.Lock()
+
+    def get_rate(self, currency_from, currency_to):
+        """
+        Returns the rate to convert an amount from one currency to another.
+
+        :param str currency_from: currency of the amount.
+        :param str currency_to: currency to convert the amount to.
+        :return: rate of the pair or None if no version knows it.
+        :rtype: float
+        """
+        if not currency_from or not currency_to or currency_from == currency_to:
+            return 1.0
+
+        pair = (currency_from, currency_to)
+        rate = self.rates.get(pair)
+        if rate is None and pair not in self.missing_pairs:
+            with self._lock:
+                rate = self.rates.get(pair)
+                if rate is None and pair not in self.missing_pairs:
+                    converted_amount = ExchangeRate.get_conversion_rate(
+                        price=self.PROBE_AMOUNT,
+                        currency_from=currency_from,
+                        currency_to=currency_to
+                    )
+                    if converted_amount is None:
+                        self.missing_pairs.add(pair)
+                    else:
+                        rate = converted_amount / self.PROBE_AMOUNT
+                        self.rates[pair] = rate
+        if rate is None:
+            rate = self.previous_rates.get(pair)
+        return rate
+
+    def convert_many(self, prices, currencies_from, currency_to):
+        """
+        Converts all the prices to a single currency in one pass, prices whose rate is not known are NaN.
+
+        :param list prices: amounts to convert.
+        :param list currencies_from: currency of each amount.
+        :param str currency_to: currency to convert the amounts to.
+        :rtype: numpy.ndarray
+        """
+        rates = numpy.fromiter(
+            (self.get_rate(currency_from, currency_to) for currency_from in currencies_from),
+            dtype=float,
+            count=len(prices)
+        )
+        return numpy.asarray(prices, dtype=float) * rates
+
+
+class ExchangeRateRepo(object):
+    """
+    Keeps the exchange rate matrix of current worker.
+
+    The matrix is replaced with a new version every `EXCHANGE_RATE_REFRESH_INTERVAL` seconds, rates of the new
+    version are read from DB on their first use. Pairs missing in DB keep being served with their last known rate.
+    """
+    DEFAULT_REFRESH_INTERVAL = 60 * 60
+
+    _matrix = None
+    _matrix_lock = threading.Lock()
+
+    @classmethod
+    def get_matrix(cls):
+        """
+        Returns the current exchange rate matrix, replacing it if it is older than the refresh interval.
+
+        :rtype: ExchangeRateMatrix
+        """
+        refresh_interval = current_app.config.get('EXCHANGE_RATE_REFRESH_INTERVAL', cls.DEFAULT_REFRESH_INTERVAL)
+        matrix = cls._matrix
+        if matrix is None or time.monotonic() - matrix.loaded_at > refresh_interval:
+            with cls._matrix_lock:
+                matrix = cls._matrix
+                if matrix is None or time.monotonic() - matrix.loaded_at > refresh_interval:
+                    matrix = ExchangeRateMatrix(version=matrix.version + 1 if matrix else 1, previous=matrix)
+                    cls._matrix = matrix
+        return matrix
+
+    @classmethod
+    def get_version(cls):
+        """
+        Returns version of the current exchange rate matrix.
+
+        :rtype: int
+        """
+        return cls.get_matrix().version
+
+    @classmethod
+    def convert(cls, price, currency_from, currency_to):
+        """
+        Converts a single price to the passed currency.
+
+        :return: converted price or None if the rate is not known.
+        :rtype: float
+        """
+        rate = cls.get_matrix().get_rate(currency_from, currency_to)
+        if rate is None:
+            return None
+        return price * rate
+
+    @classmethod
+    def convert_many(cls, prices, currencies_from, currency_to):
+        """
+        Converts all the prices to the passed currency using a single version of the exchange rates, prices whose rate
+        is not known are NaN.
+
+        :param list prices: amounts to convert.
+        :param list currencies_from: currency of each amount.
+        :param str currency_to: currency to convert the amounts to.
+        :rtype: list
+        """
+        if not prices:
+            return []
+        return cls.get_matrix().convert_many(prices, currencies_from, currency_to).tolist()
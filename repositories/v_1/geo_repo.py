@@ -0,0 +1,473 @@
+"""
+Geo Repo module contains the in-process reverse geocoder and coordinate specific helper methods.
+"""
+import csv
+import gettext
+import math
+import re
+import threading
+import unicodedata
+from array import array
+
+import numpy
+import pycountry
+from flask import current_app
+from geopy.geocoders import Nominatim
+
+EARTH_RADIUS_KM = 6371.0088
+EARTH_RADIUS_METERS = EARTH_RADIUS_KM * 1000
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(lat, lng, precision=6):
+    """
+    Encodes the passed coordinates to a geohash of the passed precision.
+
+    Precision 5 is a ~4.9km x 4.9km bucket and precision 6 a ~1.2km x 0.6km bucket.
+
+    :param float lat: latitude of the point.
+    :param float lng: longitude of the point.
+    :param int precision: number of characters in the geohash.
+    :rtype: str
+    """
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    lat, lng = float(lat), float(lng)
+    geohash = []
+    bits, bit_count, is_lng = 0, 0, True
+    while len(geohash) < precision:
+        value, value_range = (lng, lng_range) if is_lng else (lat, lat_range)
+        middle = (value_range[0] + value_range[1]) / 2
+        if value >= middle:
+            bits = (bits << 1) | 1
+            value_range[0] = middle
+        else:
+            bits <<= 1
+            value_range[1] = middle
+        is_lng = not is_lng
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return ''.join(geohash)
+
+
+def get_haversine_distances(lat, lng, lats, lngs):
+    """
+    Returns great-circle distances in meters from the point to all the passed coordinates in one batched pass.
+
+    :param float lat: latitude of the point.
+    :param float lng: longitude of the point.
+    :param numpy.ndarray lats: latitudes in degrees.
+    :param numpy.ndarray lngs: longitudes in degrees.
+    :rtype: numpy.ndarray
+    """
+    lat, lng = numpy.radians(float(lat)), numpy.radians(float(lng))
+    lats, lngs = numpy.radians(lats), numpy.radians(lngs)
+    half_chord = (
+        numpy.sin((lats - lat) / 2) ** 2 +
+        numpy.cos(lat) * numpy.cos(lats) * numpy.sin((lngs - lng) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_METERS * numpy.arcsin(numpy.sqrt(numpy.minimum(half_chord, 1.0)))
+
+
+def filter_within_radius(lat, lng, lats, lngs, radius):
+    """
+    Returns a mask of coordinates lying within the radius around the point along with their distances.
+
+    :param float lat: latitude of the point.
+    :param float lng: longitude of the point.
+    :param numpy.ndarray lats: latitudes in degrees.
+    :param numpy.ndarray lngs: longitudes in degrees.
+    :param float radius: radius in meters.
+    :rtype: tuple
+    """
+    distances = get_haversine_distances(lat, lng, lats, lngs)
+    return distances <= float(radius), distances
+
+
+class ReverseGeocoder(object):
+    """
+    In-process reverse geocoder backed by a KD-tree over city centroids.
+
+    Cities are read once from a CSV file having `lat,lon,name,admin1,admin2,cc` columns (e.g. the GeoNames
+    cities1000 extract). Centroids are projected on the unit sphere so that the euclidean nearest neighbour is also
+    the great-circle nearest neighbour and no special handling is needed around the poles or the anti-meridian.
+    The tree is implicit: for every `[low, high)` slice of `order` the node lives at the middle index.
+    """
+
+    def __init__(self, cities_file=None):
+        self.xs, self.ys, self.zs = array('d'), array('d'), array('d')
+        self.cities = []
+        self.order = array('l')
+        self.country_names = {}
+        if cities_file:
+            self.load(cities_file)
+
+    def __len__(self):
+        return len(self.cities)
+
+    @staticmethod
+    def to_unit_vector(lat, lng):
+        """
+        Converts latitude and longitude in degrees to a point on the unit sphere.
+
+        :rtype: tuple
+        """
+        lat, lng = math.radians(float(lat)), math.radians(float(lng))
+        cos_lat = math.cos(lat)
+        return cos_lat * math.cos(lng), cos_lat * math.sin(lng), math.sin(lat)
+
+    def get_country_name(self, country_code):
+        """
+        Returns english name of the country against its ISO alpha-2 code.
+
+        :param str country_code: ISO alpha-2 code of the country.
+        :rtype: str
+        """
+        if country_code not in self.country_names:
+            try:
+                country = pycountry.countries.get(alpha_2=country_code)
+            except (KeyError, LookupError):
+                country = None
+            self.country_names[country_code] = getattr(country, 'name', '')
+        return self.country_names[country_code]
+
+    def load(self, cities_file):
+        """
+        Loads the cities from the passed CSV file and builds the KD-tree.
+
+        :param str cities_file: path of the cities CSV file.
+        """
+        with open(cities_file, encoding='utf-8') as cities_csv:
+            for row in csv.DictReader(cities_csv):
+                try:
+                    x, y, z = self.to_unit_vector(row['lat'], row['lon'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                self.xs.append(x)
+                self.ys.append(y)
+                self.zs.append(z)
+                country_code = row.get('cc', '')
+                self.cities.append((
+                    row.get('name', ''),
+                    row.get('admin1', ''),
+                    row.get('admin2', ''),
+                    country_code
+                ))
+                self.get_country_name(country_code)
+
+        self.order = array('l', range(len(self.cities)))
+        self._build(0, len(self.order), 0)
+
+    def _build(self, low, high, depth):
+        """
+        Arranges `order[low:high]` so that its middle element splits the slice on the axis of the current depth.
+        """
+        stack = [(low, high, depth)]
+        axes = (self.xs, self.ys, self.zs)
+        while stack:
+            low, high, depth = stack.pop()
+            if high - low <= 1:
+                continue
+            axis = axes[depth % 3]
+            self.order[low:high] = array('l', sorted(self.order[low:high], key=axis.__getitem__))
+            middle = (low + high) // 2
+            stack.append((low, middle, depth + 1))
+            stack.append((middle + 1, high, depth + 1))
+
+    def nearest(self, lat, lng):
+        """
+        Returns the index of the city nearest to the passed coordinates and its distance in kilometers.
+
+        :rtype: tuple
+        """
+        if not self.cities:
+            return None, None
+
+        point = self.to_unit_vector(lat, lng)
+        axes = (self.xs, self.ys, self.zs)
+        best_index, best_distance = None, float('inf')
+        stack = [(0, len(self.order), 0, 0.0)]
+        while stack:
+            low, high, depth, bound = stack.pop()
+            if low >= high or bound >= best_distance:
+                continue
+            middle = (low + high) // 2
+            index = self.order[middle]
+            distance = (
+                (self.xs[index] - point[0]) ** 2 +
+                (self.ys[index] - point[1]) ** 2 +
+                (self.zs[index] - point[2]) ** 2
+            )
+            if distance < best_distance:
+                best_index, best_distance = index, distance
+
+            axis = depth % 3
+            delta = point[axis] - axes[axis][index]
+            near, far = ((low, middle), (middle + 1, high)) if delta < 0 else ((middle + 1, high), (low, middle))
+            stack.append((far[0], far[1], depth + 1, delta * delta))
+            stack.append((near[0], near[1], depth + 1, 0.0))
+
+        chord = math.sqrt(best_distance)
+        return best_index, 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+    def reverse(self, lat, lng, max_distance_km):
+        """
+        Returns the address of the nearest city in the same shape as Nominatim's `raw['address']`.
+
+        :param float lat: latitude of the point.
+        :param float lng: longitude of the point.
+        :param float max_distance_km: cities farther than this are not considered a match.
+        :rtype: dict
+        """
+        index, distance = self.nearest(lat, lng)
+        if index is None or distance > max_distance_km:
+            return {}
+
+        city, state, county, country_code = self.cities[index]
+        return {
+            'city': city,
+            'state': state,
+            'county': county,
+            'country': self.get_country_name(country_code),
+            'country_code': country_code.lower()
+        }
+
+
+class CountryIndex(object):
+    """
+    Normalized country name to ISO alpha-2 lookup table.
+
+    Names, official names, common names, ISO codes, aliases and localized names of all countries are indexed once.
+    Lookups are a dictionary hit in the common case and fall back to a trigram similarity search for misspelt names.
+    """
+    LOCALIZED_NAME_LANGUAGES = ('ar', 'fr', 'de', 'es', 'it', 'ru', 'zh_CN')
+    MINIMUM_TRIGRAM_SIMILARITY = 0.5
+    ALIASES = {
+        'AE': ('UAE', 'U.A.E', 'Emirates'),
+        'GB': ('UK', 'U.K', 'Great Britain', 'England', 'Scotland', 'Wales', 'Northern Ireland'),
+        'US': ('USA', 'U.S.A', 'United States', 'America'),
+        'KR': ('South Korea', 'Korea'),
+        'KP': ('North Korea',),
+        'RU': ('Russia',),
+        'IR': ('Iran',),
+        'SY': ('Syria',),
+        'VN': ('Vietnam',),
+        'LA': ('Laos',),
+        'BO': ('Bolivia',),
+        'VE': ('Venezuela',),
+        'TZ': ('Tanzania',),
+        'MD': ('Moldova',),
+        'CZ': ('Czech Republic',),
+        'TR': ('Turkey',),
+        'CV': ('Cape Verde',),
+        'CI': ("Cote d'Ivoire", 'Ivory Coast'),
+        'PS': ('Palestine',),
+        'TW': ('Taiwan',),
+        'MK': ('Macedonia',),
+        'SZ': ('Swaziland',),
+        'VA': ('Vatican', 'Vatican City'),
+    }
+
+    def __init__(self):
+        self.names = {}
+        self.trigrams = {}
+
+    @staticmethod
+    def normalize(name):
+        """
+        Lower cases the name and strips accents, punctuation and extra whitespace from it.
+
+        :rtype: str
+        """
+        name = unicodedata.normalize('NFKD', name or '')
+        name = ''.join(char for char in name if not unicodedata.combining(char))
+        return ' '.join(re.sub(r"[^\w\s]", ' ', name.lower()).split())
+
+    @staticmethod
+    def get_trigrams(name):
+        """
+        Returns the set of trigrams of the padded name.
+
+        :rtype: set
+        """
+        padded = '  {}  '.format(name)
+        return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+    def add(self, name, alpha_2):
+        """
+        Adds the name of the country in the index.
+        """
+        name = self.normalize(name)
+        if name and name not in self.names:
+            self.names[name] = alpha_2
+            for trigram in self.get_trigrams(name):
+                self.trigrams.setdefault(trigram, set()).add(name)
+
+    def build(self):
+        """
+        Builds the index from pycountry's database and translations.
+
+        :rtype: CountryIndex
+        """
+        translations = []
+        for language in self.LOCALIZED_NAME_LANGUAGES:
+            try:
+                translations.append(
+                    gettext.translation('iso3166-1', pycountry.LOCALES_DIR, languages=[language])
+                )
+            except (IOError, OSError):
+                continue
+
+        for country in pycountry.countries:
+            names = [
+                country.alpha_2,
+                country.alpha_3,
+                country.name,
+                getattr(country, 'official_name', ''),
+                getattr(country, 'common_name', '')
+            ]
+            names.extend(self.ALIASES.get(country.alpha_2, ()))
+            for translation in translations:
+                names.append(translation.gettext(country.name))
+            for name in names:
+                self.add(name, country.alpha_2)
+        return self
+
+    def resolve(self, name):
+        """
+        Returns ISO alpha-2 code of the country against the passed name or an empty string if it is not resolved.
+
+        Exact normalized names are looked up first and then the most similar name by trigrams is picked.
+
+        :param str name: name of the country.
+        :rtype: str
+        """
+        name = self.normalize(name)
+        if not name:
+            return ''
+
+        alpha_2 = self.names.get(name)
+        if alpha_2:
+            return alpha_2
+
+        name_trigrams = self.get_trigrams(name)
+        shared_trigrams = {}
+        for trigram in name_trigrams:
+            for candidate in self.trigrams.get(trigram, ()):
+                shared_trigrams[candidate] = shared_trigrams.get(candidate, 0) + 1
+
+        best_name, best_similarity = None, 0.0
+        for candidate, shared in shared_trigrams.items():
+            similarity = shared / (len(name_trigrams) + len(self.get_trigrams(candidate)) - shared)
+            if similarity > best_similarity:
+                best_name, best_similarity = candidate, similarity
+
+        if best_similarity >= self.MINIMUM_TRIGRAM_SIMILARITY:
+            return self.names[best_name]
+        return ''
+
+
+class GeoRepo(object):
+    NOMINATIM_USER_AGENT = 'ent_travel'
+    DEFAULT_MAX_CITY_DISTANCE_KM = 50
+
+    _reverse_geocoder = None
+    _reverse_geocoder_lock = threading.Lock()
+    _country_index = None
+    _country_index_lock = threading.Lock()
+
+    @classmethod
+    def get_country_index(cls):
+        """
+        Returns the process wide country name index, building it on first use.
+
+        :rtype: CountryIndex
+        """
+        if cls._country_index is None:
+            with cls._country_index_lock:
+                if cls._country_index is None:
+                    cls._country_index = CountryIndex().build()
+        return cls._country_index
+
+    @classmethod
+    def get_country_code(cls, country_name):
+        """
+        Returns ISO alpha-2 code of the country against its name, alias or localized name.
+
+        :param str country_name: name of the country.
+        :rtype: str
+        """
+        return cls.get_country_index().resolve(country_name)
+
+    @classmethod
+    def get_reverse_geocoder(cls):
+        """
+        Returns the process wide reverse geocoder, loading the cities dataset on first use.
+
+        The dataset path is read from `REVERSE_GEOCODER_CITIES_FILE`. Loading is done once per worker, the gunicorn
+        master can warm it up before forking when the app is preloaded. A missing path or an empty dataset is logged
+        as the geocoder is unable to resolve any coordinates then.
+
+        :rtype: ReverseGeocoder
+        """
+        if cls._reverse_geocoder is None:
+            with cls._reverse_geocoder_lock:
+                if cls._reverse_geocoder is None:
+                    reverse_geocoder = ReverseGeocoder()
+                    cities_file = current_app.config.get('REVERSE_GEOCODER_CITIES_FILE')
+                    if not cities_file:
+                        current_app.logger.error('REVERSE_GEOCODER_CITIES_FILE is not set, no cities are loaded.')
+                    else:
+                        try:
+                            reverse_geocoder.load(cities_file)
+                        except (IOError, OSError) as e:
+                            current_app.logger.error('Unable to load reverse geocoder cities: %s', e)
+                        else:
+                            if not len(reverse_geocoder):
+                                current_app.logger.error('No reverse geocoder cities found in %s', cities_file)
+                    cls._reverse_geocoder = reverse_geocoder
+        return cls._reverse_geocoder
+
+    @classmethod
+    def reverse_geocode_nominatim(cls, lat, lng):
+        """
+        Reverse geocodes the passed coordinates using Nominatim over the network.
+
+        :rtype: dict
+        """
+        try:
+            geolocator = Nominatim(user_agent=cls.NOMINATIM_USER_AGENT)
+            location = geolocator.reverse(
+                "{latitude}, {longitude}".format(latitude=lat, longitude=lng),
+                language='en'
+            )
+        except Exception:
+            location = None
+
+        if location:
+            return getattr(location, 'raw', {}).get('address', {})
+        return {}
+
+    @classmethod
+    def reverse_geocode(cls, lat, lng):
+        """
+        Returns the address (city, state, county, country and country_code) of the passed coordinates.
+
+        The in-process geocoder is used by default. Nominatim is hit when no cities are loaded in the in-process
+        geocoder, or when `REVERSE_GEOCODER_NOMINATIM_FALLBACK` is enabled and the in-process geocoder was unable to
+        resolve the coordinates.
+
+        :param float lat: latitude of the point.
+        :param float lng: longitude of the point.
+        :rtype: dict
+        """
+        max_distance_km = current_app.config.get('REVERSE_GEOCODER_MAX_DISTANCE_KM', cls.DEFAULT_MAX_CITY_DISTANCE_KM)
+        reverse_geocoder = cls.get_reverse_geocoder()
+        if not len(reverse_geocoder):
+            return cls.reverse_geocode_nominatim(lat, lng)
+
+        address = reverse_geocoder.reverse(lat, lng, max_distance_km)
+        if not address and current_app.config.get('REVERSE_GEOCODER_NOMINATIM_FALLBACK'):
+            address = cls.reverse_geocode_nominatim(lat, lng)
+        return address
@@ -0,0 +1,298 @@
+"""
+History Repo module contains the write-behind queue used to save the recently viewed hotels and recent searches.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from flask import current_app
+
+from models.mongo_models.searches import Searches
+from models.mongo_models.viewed_hotels import ViewedHotels
+from repositories.v_1.customer_state_repo import CustomerStateRepo
+
+
+class HistoryWriter(object):
+    """
+    Writes the history of customers in the background of a worker.
+
+    Writes are put in a bounded queue and a flusher thread saves them in batches. Within a batch, writes of the same
+    customer for the same hotel or search are coalesced and only the latest one is saved. Writes are dropped when the
+    queue is full so requests never wait on it, the queue is drained when the worker exits.
+
+    Keys start with the type of history and the customer, writes queued before that history of the customer is
+    cleared are discarded so a clear is never undone by an older write. Only writes queued in current worker are
+    discarded.
+    """
+
+    def __init__(self, app, maxsize=10000, batch_size=500, flush_interval=1.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.metrics = {
+            'enqueued': 0,
+            'dropped': 0,
+            'coalesced': 0,
+            'written': 0,
+            'failed': 0,
+            'discarded': 0
+        }
+        self.cleared_at = {}
+        self._metrics_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self.run, name='history-writer', daemon=True)
+        self._thread.start()
+
+    def increment(self, metric, count=1):
+        with self._metrics_lock:
+            self.metrics[metric] += count
+
+    def enqueue(self, key, write, **kwargs):
+        """
+        Queues a write without blocking.
+
+        :param tuple key: key on which writes are coalesced.
+        :param write: callable saving the history.
+        :return: whether the write is queued.
+        :rtype: bool
+        """
+        if self._stopped.is_set():
+            self.increment('dropped')
+            return False
+        try:
+            self.queue.put_nowait((key, write, kwargs, time.monotonic()))
+        except queue.Full:
+            self.increment('dropped')
+            return False
+        self.increment('enqueued')
+        return True
+
+    def get_batch(self):
+        """
+        Returns the queued writes coalesced on their keys, waiting up to the flush interval for the first one.
+
+        :rtype: OrderedDict
+        """
+        batch = OrderedDict()
+        try:
+            item = self.queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return batch
+
+        items = 0
+        while True:
+            key, write, kwargs, queued_at = item
+            if key in batch:
+                batch.move_to_end(key)
+                self.increment('coalesced')
+            batch[key] = (write, kwargs, queued_at)
+            items += 1
+            if items >= self.batch_size:
+                break
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self, batch):
+        """
+        Saves all the writes of the batch, discarding the ones queued before their history was cleared.
+        """
+        for key, (write, kwargs, queued_at) in batch.items():
+            with self._write_lock:
+                if queued_at <= self.cleared_at.get(key[:2], float('-inf')):
+                    self.increment('discarded')
+                    continue
+                try:
+                    write(**kwargs)
+                    self.increment('written')
+                except Exception as e:
+                    self.increment('failed')
+                    self.app.logger.error('Unable to save history: %s', e)
+
+    def clear(self, history_key, clear):
+        """
+        Clears the history, writes of the history queued so far are never saved afterwards.
+
+        :param tuple history_key: type of history and ID of customer.
+        :param clear: callable clearing the saved history.
+        :return: result of `clear`.
+        """
+        with self._write_lock:
+            self.cleared_at[history_key] = time.monotonic()
+            return clear()
+
+    def forget_clears(self):
+        """
+        Forgets the clears once no write queued before them is left.
+        """
+        with self._write_lock:
+            if self.queue.empty():
+                self.cleared_at.clear()
+
+    def run(self):
+        """
+        Keeps flushing the queued writes till the writer is stopped and the queue is empty.
+        """
+        with self.app.app_context():
+            while not (self._stopped.is_set() and self.queue.empty()):
+                batch = self.get_batch()
+                if batch:
+                    self.flush(batch)
+                if self.cleared_at:
+                    self.forget_clears()
+
+    def stop(self, timeout=None):
+        """
+        Stops accepting writes and waits for the queued ones to be saved.
+
+        :param float timeout: seconds to wait for the queue to drain.
+        """
+        self._stopped.set()
+        self._thread.join(timeout)
+
+
+class HistoryRepo(object):
+    """
+    Saves the history of customers through the write-behind writer of current worker.
+
+    Queue size, batch size and flush interval are read from `HISTORY_QUEUE_SIZE`, `HISTORY_BATCH_SIZE` and
+    `HISTORY_FLUSH_INTERVAL`, writes are done synchronously if `HISTORY_WRITE_BEHIND_ENABLED` is off.
+    """
+    DEFAULT_DRAIN_TIMEOUT = 5
+    VIEWED_HOTEL = 'viewed_hotel'
+    RECENT_SEARCH = 'recent_search'
+
+    _writer = None
+    _writer_pid = None
+    _writer_lock = threading.Lock()
+
+    @classmethod
+    def get_writer(cls):
+        """
+        Returns the writer of current worker process, starting it after a fork.
+
+        :rtype: HistoryWriter
+        """
+        if cls._writer is None or cls._writer_pid != os.getpid():
+            with cls._writer_lock:
+                if cls._writer is None or cls._writer_pid != os.getpid():
+                    config = current_app.config
+                    cls._writer = HistoryWriter(
+                        current_app._get_current_object(),
+                        maxsize=config.get('HISTORY_QUEUE_SIZE', 10000),
+                        batch_size=config.get('HISTORY_BATCH_SIZE', 500),
+                        flush_interval=config.get('HISTORY_FLUSH_INTERVAL', 1.0)
+                    )
+                    cls._writer_pid = os.getpid()
+                    atexit.register(cls._writer.stop, config.get('HISTORY_DRAIN_TIMEOUT', cls.DEFAULT_DRAIN_TIMEOUT))
+        return cls._writer
+
+    @classmethod
+    def save(cls, key, write, **kwargs):
+        """
+        Saves the history in the background, or right away if write-behind is disabled.
+        """
+        if not current_app.config.get('HISTORY_WRITE_BEHIND_ENABLED', True):
+            write(**kwargs)
+            return
+        cls.get_writer().enqueue(key, write, **kwargs)
+
+    @classmethod
+    def clear(cls, history_type, customer_id, clear):
+        """
+        Clears the history of the customer, discarding its writes queued in the writer of current worker.
+
+        :param str history_type: type of history.
+        :param int customer_id: ID of customer.
+        :param clear: callable clearing the saved history.
+        :return: result of `clear`.
+        """
+        if cls._writer is None or cls._writer_pid != os.getpid():
+            return clear()
+        return cls._writer.clear((history_type, customer_id), clear)
+
+    @staticmethod
+    def write_viewed_hotel(customer_id, **kwargs):
+        """
+        Writes the viewed hotel in MONGO and drops the cached recently viewed hotels count of the customer.
+        """
+        ViewedHotels.save_viewed_hotel(customer_id=customer_id, **kwargs)
+        CustomerStateRepo.invalidate_recent_hotels(customer_id)
+
+    @classmethod
+    def save_viewed_hotel(cls, customer_id, outlet_id, merchant_id, title):
+        """
+        Saves the hotel in recently viewed hotels of the customer.
+        """
+        CustomerStateRepo.invalidate_recent_hotels(customer_id)
+        cls.save(
+            (cls.VIEWED_HOTEL, customer_id, outlet_id),
+            cls.write_viewed_hotel,
+            customer_id=customer_id,
+            outlet_id=outlet_id,
+            merchant_id=merchant_id,
+            title=title
+        )
+
+    @classmethod
+    def save_recent_search(cls, customer_id, title, search_type, **kwargs):
+        """
+        Saves the search in recent searches of the customer.
+        """
+        cls.save(
+            (cls.RECENT_SEARCH, customer_id, kwargs.get('outlet_id'), title, search_type),
+            Searches.save_recent_search,
+            customer_id=customer_id,
+            title=title,
+            search_type=search_type,
+            **kwargs
+        )
+
+    @classmethod
+    def clear_viewed_hotels(cls, customer_id):
+        """
+        Clears the recently viewed hotels of the customer.
+
+        :param int customer_id: ID of customer.
+        :return: whether any viewed hotel was cleared.
+        :rtype: bool
+        """
+        cleared = cls.clear(
+            cls.VIEWED_HOTEL,
+            customer_id,
+            partial(ViewedHotels.deactivate_viewed_hotels, customer_id=customer_id)
+        )
+        CustomerStateRepo.invalidate_recent_hotels(customer_id)
+        return cleared
+
+    @classmethod
+    def clear_recent_searches(cls, customer_id):
+        """
+        Clears the recent searches of the customer.
+
+        :param int customer_id: ID of customer.
+        :return: whether any search was cleared.
+        :rtype: bool
+        """
+        return cls.clear(cls.RECENT_SEARCH, customer_id, partial(Searches.deactivate_recent_searches, customer_id))
+
+    @classmethod
+    def get_metrics(cls):
+        """
+        Returns the metrics of the writer of current worker.
+
+        :rtype: dict
+        """
+        if cls._writer is None or cls._writer_pid != os.getpid():
+            return {}
+        metrics = dict(cls._writer.metrics)
+        metrics['queued'] = cls._writer.queue.qsize()
+        return metrics
@@ -1,8 +1,14 @@
 """
 Home Repo module contains all the Home API specific implementation and helper methods.
 """
+import copy
+
+from flask import current_app
+
 from models.destinations import Destinations
 from models.home_section import HomeSection
+from repositories.v_1.cache_repo import TTLCache
+from repositories.v_1.concurrency_repo import TaskGraph
 
 
 class HomeRepo(object):
@@ -16,6 +22,69 @@ class HomeRepo(object):
     RECENT_HOTELS_COUNT = '{recent_hotels_count} Hotels'
     ACTIVE_HOTELS_COUNT = '{active_hotels} Hotels'
     DESTINATIONS_LIMIT = 5
+    ACTIVE_HOTELS_COUNT_TTL = 15 * 60
+    HOME_SKELETON_TTL = 10 * 60
+
+    active_hotels_counts = TTLCache(maxsize=5000, ttl=ACTIVE_HOTELS_COUNT_TTL, name='active_hotels_counts')
+    home_skeleton_cache = TTLCache(maxsize=32, ttl=HOME_SKELETON_TTL, name='home_skeleton')
+
+    @classmethod
+    def get_home_skeleton(cls, locale, build_home_skeleton):
+        """
+        Gets the home sections shared by all users of the locale, building them on a miss.
+
+        Skeletons are cached in every worker and rebuilt every `HOME_SKELETON_TTL` seconds, home sections and
+        destinations are updated outside this service so their changes show up within that time. Every call gets its
+        own copy of the skeleton so it can be changed while building the response.
+
+        :param str locale: language of the user.
+        :param build_home_skeleton: callable building the skeleton.
+        :rtype: dict
+        """
+        home_skeleton = cls.home_skeleton_cache.get_or_set(
+            locale,
+            build_home_skeleton,
+            ttl=current_app.config.get('HOME_SKELETON_TTL', cls.HOME_SKELETON_TTL)
+        )
+        return copy.deepcopy(home_skeleton)
+
+    @classmethod
+    def get_active_hotels_counts(cls, location_ids):
+        """
+        Gets count of active hotels of all the locations.
+
+        Counts are kept in a table refreshed every `ACTIVE_HOTELS_COUNT_TTL` seconds, counts missing in the table are
+        fetched from DB concurrently. Counts whose fetch failed or was not done within `ACTIVE_HOTELS_COUNT_DEADLINE`
+        seconds are fetched again one by one, only the counts fetched successfully are kept in the table.
+
+        :param list location_ids: IDs of the locations.
+        :return: count of active hotels against location ID.
+        :rtype: dict
+        """
+        counts = {}
+        missing_location_ids = set()
+        for location_id in location_ids:
+            count = cls.active_hotels_counts.get(location_id)
+            if count is None:
+                missing_location_ids.add(location_id)
+            else:
+                counts[location_id] = count
+
+        if missing_location_ids:
+            task_graph = TaskGraph(deadline=current_app.config.get('ACTIVE_HOTELS_COUNT_DEADLINE'))
+            for location_id in missing_location_ids:
+                task_graph.add(location_id, Destinations.get_active_hotels, location_id=location_id)
+            results = task_graph.run()
+            ttl = current_app.config.get('ACTIVE_HOTELS_COUNT_TTL', cls.ACTIVE_HOTELS_COUNT_TTL)
+            for location_id in missing_location_ids:
+                if location_id in task_graph.errors or location_id not in results:
+                    count = Destinations.get_active_hotels(location_id=location_id)
+                else:
+                    count = results[location_id]
+                if count is not None:
+                    cls.active_hotels_counts.set(location_id, count, ttl)
+                    counts[location_id] = count
+        return counts
 
     @staticmethod
     def get_travel_style_tiles():
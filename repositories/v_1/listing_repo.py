@@ -4,13 +4,14 @@ Listing Repo module contains all the listing specific static data, implementatio
 import math
 from copy import deepcopy
 
-import pycountry
+import numpy
 from fuzzywuzzy import fuzz
-from geopy.geocoders import Nominatim
-from shapely.geometry import Point
 
 from common.constants.icons import Icons
 from common.utils.api_utils import is_valid_coordinates
+from repositories.v_1.cache_repo import TTLCache
+from repositories.v_1.geo_repo import (GeoRepo, encode_geohash,
+                                       filter_within_radius)
 from repositories.v_1.search_repo import SearchRepo
 
 
@@ -19,6 +20,9 @@ class ListingRepo(object):
     INQUIRE_FOR_RATES = 'Inquire For Rates'
     LISTING_SECTION_TITLE = '{} Hotels'
     MINIMUM_FUZZY_MATCH_RATIO = 90
+    CURRENT_LOCATION_GEOHASH_PRECISION = 6
+
+    current_location_cache = TTLCache(maxsize=20000, ttl=60 * 60, name='is_current_location')
 
     SORT_OPTIONS = [
         {
@@ -84,40 +88,56 @@ class ListingRepo(object):
         """
         Returns if current location of a customer is the same as the searched location.
 
+        Results are cached against the geohash bucket of the coordinates, search type and normalized search query so
+        paginating or re-sorting a listing does not repeat the lookup. See `current_location_cache.stats` for hit/miss
+        counters.
+
+        :rtype: bool
+        """
+        if not (lat and lng):
+            return False
+
+        cache_key = (
+            encode_geohash(lat, lng, cls.CURRENT_LOCATION_GEOHASH_PRECISION),
+            search_type,
+            (search_query or '').strip().lower()
+        )
+        is_current_location = cls.current_location_cache.get(cache_key)
+        if is_current_location is None:
+            is_current_location = cls._is_current_location(lat, lng, search_type, search_query)
+            cls.current_location_cache.set(cache_key, is_current_location)
+        return is_current_location
+
+    @classmethod
+    def _is_current_location(cls, lat, lng, search_type, search_query):
+        """
+        Matches current location of a customer with the searched location without cache.
+
         We use fuzzywuzzy to match current location with outlet billing city or country based on search type.
+        Current location is resolved by the in-process reverse geocoder, see `GeoRepo.reverse_geocode`. In case of
+        country search, the searched name, alias or ISO code is resolved to its ISO alpha-2 code so it can be matched
+        with the country code of current location.
 
         :rtype: bool
         """
 
         if lat and lng:
-            try:
-                geolocator = Nominatim(user_agent="ent_travel")
-                location = geolocator.reverse(
-                    "{latitude}, {longitude}".format(latitude=lat, longitude=lng),
-                    language='en'
+            usr_location = ''
+            usr_location_address = GeoRepo.reverse_geocode(lat, lng)
+
+            if search_type == SearchRepo.SEARCH_TYPE_CITY:
+                usr_location = (
+                    usr_location_address.get('city', '') or
+                    usr_location_address.get('state', '') or
+                    usr_location_address.get('county', '')
                 )
-            except Exception:
-                location = None
-
-            if location:
-                usr_location = ''
-                usr_location_address = getattr(location, 'raw', {}).get('address', {})
-
-                if search_type == SearchRepo.SEARCH_TYPE_CITY:
-                    usr_location = (
-                        usr_location_address.get('city', '') or
-                        usr_location_address.get('state', '') or
-                        usr_location_address.get('county', '')
-                    )
-                elif search_type == SearchRepo.SEARCH_TYPE_COUNTRY:
-                    usr_country = usr_location_address.get('country', '')
-                    usr_country_info = pycountry.countries.search_fuzzy(usr_country)
-                    if usr_country_info:
-                        usr_location = usr_country_info[0].alpha_2
-
-                if usr_location and search_query:
-                    match_ratio = fuzz.ratio(usr_location.lower(), search_query.lower())
-                    return match_ratio >= cls.MINIMUM_FUZZY_MATCH_RATIO
+            elif search_type == SearchRepo.SEARCH_TYPE_COUNTRY:
+                usr_location = usr_location_address.get('country_code', '').upper()
+                search_query = GeoRepo.get_country_code(search_query) or search_query
+
+            if usr_location and search_query:
+                match_ratio = fuzz.ratio(usr_location.lower(), search_query.lower())
+                return match_ratio >= cls.MINIMUM_FUZZY_MATCH_RATIO
 
         return False
 
@@ -242,8 +262,9 @@ class ListingRepo(object):
         """
         Filters out the outlets as per required in a map of a certain radius.
 
-        Calculates the outlets present in a certain radius around the given latitude and longitude values.
-        :param int radius: Radius of the map.
+        Calculates the outlets present in a certain radius around the given latitude and longitude values. Distances
+        are great-circle distances evaluated for all outlets in one batched pass.
+        :param int radius: Radius of the map in meters.
         :param point_latitude: The latitude of the point around which the radius is made.
         :param point_longitude: The longitude of the point around which the radius is made.
         :param outlets: The total outlets from which the results are supposed to be filtered from.
@@ -251,7 +272,6 @@ class ListingRepo(object):
         """
         outlets = list(filter(lambda x: is_valid_coordinates(x['lat'], x['lng']), outlets))
         if outlets:
-            polygon_radius = radius / 100000
             if not (
                 point_latitude and
                 point_longitude and
@@ -261,7 +281,9 @@ class ListingRepo(object):
                 point_latitude = outlets[0]['lat']
                 point_longitude = outlets[0]['lng']
 
-            polygon = Point(float(point_longitude), float(point_latitude)).buffer(float(polygon_radius))
-            outlets = list(filter(lambda x: polygon.contains(Point(float(x['lng']), float(x['lat']))), outlets))
+            lats = numpy.fromiter((float(outlet['lat']) for outlet in outlets), dtype=float, count=len(outlets))
+            lngs = numpy.fromiter((float(outlet['lng']) for outlet in outlets), dtype=float, count=len(outlets))
+            in_radius, _ = filter_within_radius(point_latitude, point_longitude, lats, lngs, radius or 0)
+            outlets = [outlet for outlet, is_in_radius in zip(outlets, in_radius) if is_in_radius]
 
         return outlets
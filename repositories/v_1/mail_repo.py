@@ -3,13 +3,15 @@ Mail Repo module contains all the mails specific implementation and helper metho
 """
 import json
 
-import requests
 from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
 
 from common.constants.values import Companies, Locales
 from common.utils.api_utils import (get_current_date_time,
                                     process_request_response_data)
+from models.db import db
 from models.ent_send_email import EntSendEmail
+from repositories.v_1.upstream_repo import UpstreamRepo
 
 
 class MailRepo(object):
@@ -46,7 +48,7 @@ class MailRepo(object):
                 request_headers = {
                     'Authorization': 'Bearer {authentication_token}'.format(authentication_token=bearer_token)
                 }
-                response = requests.post(
+                response = UpstreamRepo.get_client(UpstreamRepo.USER_INFO).post(
                     user_api_url,
                     json=request_data,
                     headers=request_headers
@@ -61,6 +63,23 @@ class MailRepo(object):
 
         return user_email
 
+    @classmethod
+    def get_email_entry(cls, email, email_type_id, email_data, optional_data, language, priority, dump):
+        """
+        Returns the entry of EntSendEmail table for an email.
+
+        :rtype: dict
+        """
+        return {
+            'email_to': email,
+            'email_template_type_id': email_type_id,
+            'email_template_data': json.dumps(email_data) if dump else email_data,
+            'optional_data': json.dumps(optional_data) if dump else optional_data,
+            'language': language,
+            'priority': priority,
+            'created_date': get_current_date_time()
+        }
+
     @classmethod
     def send_email(cls, **kwargs):
         """
@@ -73,17 +92,55 @@ class MailRepo(object):
         > email
         > email_type_id
         """
-
-        dump = kwargs.get('dump')
-        email_data = kwargs.get('email_data')
-        optional_data = kwargs.get('optional_data')
-        email_data = {
-            'email_to': kwargs.get('email'),
-            'email_template_type_id': kwargs.get('email_type_id'),
-            'email_template_data': json.dumps(email_data) if dump else email_data,
-            'optional_data': json.dumps(optional_data) if dump else optional_data,
-            'language': kwargs.get('language', Locales.EN),
-            'priority': kwargs.get('priority', cls.PRIORITY_LOW),
-            'created_date': get_current_date_time()
-        }
+        email_data = cls.get_email_entry(
+            email=kwargs.get('email'),
+            email_type_id=kwargs.get('email_type_id'),
+            email_data=kwargs.get('email_data'),
+            optional_data=kwargs.get('optional_data'),
+            language=kwargs.get('language', Locales.EN),
+            priority=kwargs.get('priority', cls.PRIORITY_LOW),
+            dump=kwargs.get('dump')
+        )
         return EntSendEmail.send_email(email_data)
+
+    @classmethod
+    def send_emails(cls, recipients, email_data, optional_data=None, language=Locales.EN, priority=None, dump=False):
+        """
+        Sends the same email data to multiple recipients.
+
+        Entries of all recipients are added in the EntSendEmail table with a single commit of a dedicated session, so
+        the session of the calling flow is left untouched. In case the entries can't be committed they are rolled
+        back and logged without failing the calling flow.
+
+        :param list recipients: pairs of email address and email type id.
+        :param email_data: data of email template, shared by all recipients.
+        :param optional_data: optional data of email, shared by all recipients.
+        :param str language: language of emails.
+        :param int priority: priority of emails, low by default.
+        :param bool dump: whether email data and optional data are to be JSON serialized.
+        :return: whether emails of all recipients are queued.
+        :rtype: bool
+        """
+        if dump:
+            email_data, optional_data = json.dumps(email_data), json.dumps(optional_data)
+        priority = cls.PRIORITY_LOW if priority is None else priority
+        emails = [
+            EntSendEmail(
+                **cls.get_email_entry(email, email_type_id, email_data, optional_data, language, priority, dump=False)
+            )
+            for email, email_type_id in recipients
+        ]
+
+        session = db.create_session({})()
+        try:
+            session.add_all(emails)
+            session.commit()
+        except SQLAlchemyError:
+            session.rollback()
+            current_app.logger.exception(
+                'Unable to queue emails of types %s', ', '.join(str(email.email_template_type_id) for email in emails)
+            )
+            return False
+        finally:
+            session.close()
+        return True
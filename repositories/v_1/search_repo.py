@@ -1,14 +1,25 @@
 """
 Search Repo module contains all the search specific implementation and helper methods.
 """
+import copy
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
 from elasticsearch import Elasticsearch
-from elasticsearch.exceptions import ConnectionError as ESConnectionError
+from elasticsearch.exceptions import TransportError
 from flask import current_app
 
 from common.constants.icons import Icons
 from common.constants.strings import CommonStrings
-from common.constants.values import CommonValues
+from common.constants.values import CommonValues, Locales
 from models.mongo_models.searches import Searches
+from repositories.v_1.autocomplete_repo import AutocompleteRepo
+from repositories.v_1.cache_repo import TTLCache
+from repositories.v_1.geo_repo import encode_geohash
+from repositories.v_1.upstream_repo import (CircuitBreaker,
+                                            UpstreamUnavailableError)
 
 
 class SearchRepo(object):
@@ -19,9 +30,84 @@ class SearchRepo(object):
     SEARCH_TYPE_CITY = 'city'
     SEARCH_TYPE_COUNTRY = 'country'
     SEARCH_TYPE_HOTEL = 'hotel'
+    FUZZINESS_EXACT = "0"
+    FUZZINESS_AUTO = "AUTO"
+    AUTO_COMPLETE_STRATEGY_MSEARCH = 'msearch'
+    AUTO_COMPLETE_STRATEGY_EXACT_FIRST = 'exact_first'
+    AUTO_COMPLETE_STRATEGY_HEDGED = 'hedged'
+    AUTO_COMPLETE_GEOHASH_PRECISION = 5
+    DEGRADED_RESULTS_CACHE_TTL = 30
+    ES_TOO_MANY_REQUESTS = 429
+
+    auto_complete_cache = TTLCache(maxsize=5000, ttl=10 * 60, name='auto_complete')
+
+    _es_client = None
+    _es_client_pid = None
+    _es_client_lock = threading.Lock()
+    _hedge_executor = None
+    _hedge_executor_lock = threading.Lock()
+    _es_circuit_breaker = None
+    _es_circuit_breaker_pid = None
+    _es_circuit_breaker_lock = threading.Lock()
 
     def __init__(self):
-        self.es = Elasticsearch([current_app.config.get("ELASTIC_SEARCH_BASE_URL")])
+        self.es_request_timeout = current_app.config.get("ES_AUTO_COMPLETE_TIMEOUT", 0.5)
+        # Kept on the repo since ES calls are also made on the hedge executor threads which have no app context.
+        self.logger = current_app.logger
+        self.es_circuit_breaker = self.get_es_circuit_breaker()
+
+    @classmethod
+    def get_es_circuit_breaker(cls):
+        """
+        Returns the circuit breaker guarding ES calls of current worker.
+
+        Consecutive failures to open the circuit and the seconds after which a probe is let through are read from
+        `ES_CIRCUIT_BREAKER_FAILURE_THRESHOLD` and `ES_CIRCUIT_BREAKER_RECOVERY_TIMEOUT`.
+
+        The breaker is re-created after a fork so every worker tracks the health of its own calls.
+
+        :rtype: CircuitBreaker
+        """
+        if cls._es_circuit_breaker is None or cls._es_circuit_breaker_pid != os.getpid():
+            with cls._es_circuit_breaker_lock:
+                if cls._es_circuit_breaker is None or cls._es_circuit_breaker_pid != os.getpid():
+                    cls._es_circuit_breaker = CircuitBreaker(
+                        'elasticsearch',
+                        failure_threshold=current_app.config.get("ES_CIRCUIT_BREAKER_FAILURE_THRESHOLD", 5),
+                        recovery_timeout=current_app.config.get("ES_CIRCUIT_BREAKER_RECOVERY_TIMEOUT", 30)
+                    )
+                    cls._es_circuit_breaker_pid = os.getpid()
+        return cls._es_circuit_breaker
+
+    @classmethod
+    def get_es_client(cls):
+        """
+        Returns the process wide ElasticSearch client, creating it lazily.
+
+        The client and its connection pool are re-created after a fork so gunicorn workers never share sockets.
+        Sniffing is off as the cluster is reached through a single load balanced URL. Pool size and request timeout
+        are read from `ELASTIC_SEARCH_POOL_SIZE` and `ELASTIC_SEARCH_TIMEOUT`.
+
+        :rtype: Elasticsearch
+        """
+        if cls._es_client is None or cls._es_client_pid != os.getpid():
+            with cls._es_client_lock:
+                if cls._es_client is None or cls._es_client_pid != os.getpid():
+                    cls._es_client = Elasticsearch(
+                        [current_app.config.get("ELASTIC_SEARCH_BASE_URL")],
+                        maxsize=current_app.config.get("ELASTIC_SEARCH_POOL_SIZE", 10),
+                        timeout=current_app.config.get("ELASTIC_SEARCH_TIMEOUT", 2),
+                        max_retries=current_app.config.get("ELASTIC_SEARCH_MAX_RETRIES", 0),
+                        sniff_on_start=False,
+                        sniff_on_connection_fail=False,
+                        sniffer_timeout=None
+                    )
+                    cls._es_client_pid = os.getpid()
+        return cls._es_client
+
+    @property
+    def es(self):
+        return self.get_es_client()
 
     @staticmethod
     def get_auto_suggest_es_query(query_string, lat, lng, fuzziness):
@@ -90,33 +176,59 @@ class SearchRepo(object):
         query_body["query"] = query_dict
         return query_body
 
-    def get_auto_complete_results(self, query, lat, lng):
+    def call_es(self, es_method, **kwargs):
         """
-        Gets auto complete results for Travel search bar.
+        Calls the ES method through the circuit breaker with the per-call deadline.
 
-        This function hits et_travel ES index to get autocomplete results for passed query string and then gets data.
-        We get both non-fuzzy and fuzzy results and prioritize non-fuzzy i.e. exact match results over fuzzy results.
+        Connection errors, timeouts, 429 (ES overloaded) and 5xx responses count as failures and raise
+        `UpstreamUnavailableError`. Other 4xx errors e.g. a malformed query or rejected credentials are logged and
+        re-raised as they point at a bug rather than an unhealthy cluster. Any other error is recorded as a failure
+        and re-raised so a half-open circuit never waits on a probe that didn't report back.
+
+        :rtype: dict
+        """
+        if not self.es_circuit_breaker.allow_request():
+            raise UpstreamUnavailableError('ElasticSearch circuit is open.')
+        try:
+            response = es_method(request_timeout=self.es_request_timeout, **kwargs)
+        except TransportError as e:
+            if isinstance(e.status_code, int) and e.status_code < 500 and e.status_code != self.ES_TOO_MANY_REQUESTS:
+                self.es_circuit_breaker.record_success()
+                self.logger.error('ElasticSearch rejected the request: %s', e)
+                raise
+            self.es_circuit_breaker.record_failure()
+            raise UpstreamUnavailableError(e)
+        except Exception:
+            self.es_circuit_breaker.record_failure()
+            raise
+        self.es_circuit_breaker.record_success()
+        return response
+
+    def search_travel_index(self, es, query, lat, lng, fuzziness):
+        """
+        Searches et_travel ES index with the passed fuzziness level.
 
-        :param str query: text query passed to find matches in indexed data.
-        :param float lat: latitude of user.
-        :param float lng: longitude of user.
-        :return: a formatted list of all hits got from ElasticSearch.
         :rtype: list
         """
+        response = self.call_es(
+            es.search,
+            index=CommonValues.ES_TRAVEL_INDEX,
+            body=self.get_auto_suggest_es_query(query, lat, lng, fuzziness)
+        )
+        return response.get(CommonStrings.HITS, {}).get(CommonStrings.HITS, [])
 
-        auto_complete_response = []
-        if not query:
-            return auto_complete_response
+    def get_msearch_hits(self, es, query, lat, lng):
+        """
+        Gets exact and fuzzy hits in a single msearch and prioritizes exact hits.
 
+        :rtype: list
+        """
         search_body = []
-        for fuzziness_level in ["0", "AUTO"]:
+        for fuzziness_level in [self.FUZZINESS_EXACT, self.FUZZINESS_AUTO]:
             search_body.append({"index": CommonValues.ES_TRAVEL_INDEX})
             query_body = self.get_auto_suggest_es_query(query, lat, lng, fuzziness_level)
             search_body.append(query_body)
-        try:
-            auto_complete_results = self.es.msearch(body=search_body)
-        except ESConnectionError:
-            auto_complete_results = {}
+        auto_complete_results = self.call_es(es.msearch, body=search_body)
 
         responses = auto_complete_results.get('responses', [])
         try:
@@ -128,8 +240,203 @@ class SearchRepo(object):
         except IndexError:
             fuzzy_results = []
 
-        results = non_fuzzy_results or fuzzy_results
+        return non_fuzzy_results or fuzzy_results
+
+    @staticmethod
+    def merge_hits(exact_hits, get_fuzzy_hits):
+        """
+        Appends the fuzzy hits which are not already present in exact hits.
+
+        If fuzzy hits can not be fetched, the exact hits found are still served.
+
+        :param list exact_hits: hits of the exact query.
+        :param get_fuzzy_hits: callable returning hits of the fuzzy query.
+        :rtype: list
+        """
+        try:
+            fuzzy_hits = get_fuzzy_hits()
+        except UpstreamUnavailableError:
+            if exact_hits:
+                return exact_hits
+            raise
+
+        if not exact_hits:
+            return fuzzy_hits
+        exact_ids = {hit.get('_id') for hit in exact_hits}
+        return exact_hits + [hit for hit in fuzzy_hits if hit.get('_id') not in exact_ids]
+
+    @classmethod
+    def get_hedge_executor(cls):
+        """
+        Returns the thread pool used to issue hedged fuzzy queries.
+
+        :rtype: ThreadPoolExecutor
+        """
+        if cls._hedge_executor is None:
+            with cls._hedge_executor_lock:
+                if cls._hedge_executor is None:
+                    cls._hedge_executor = ThreadPoolExecutor(
+                        max_workers=current_app.config.get("ES_AUTO_COMPLETE_HEDGE_WORKERS", 4)
+                    )
+        return cls._hedge_executor
+
+    def get_hedged_hits(self, es, query, lat, lng, min_exact_hits):
+        """
+        Runs the exact query and fires the fuzzy query in parallel only if the exact one is slow or falls short.
+
+        :rtype: list
+        """
+        executor = self.get_hedge_executor()
+        hedge_delay = current_app.config.get("ES_AUTO_COMPLETE_HEDGE_DELAY", 0.05)
+        exact_future = executor.submit(self.search_travel_index, es, query, lat, lng, self.FUZZINESS_EXACT)
+        try:
+            exact_hits = exact_future.result(timeout=hedge_delay)
+        except FuturesTimeoutError:
+            exact_hits = None
+
+        if exact_hits is not None and len(exact_hits) >= min_exact_hits:
+            return exact_hits
+
+        fuzzy_future = executor.submit(self.search_travel_index, es, query, lat, lng, self.FUZZINESS_AUTO)
+        if exact_hits is None:
+            exact_hits = exact_future.result()
+            if len(exact_hits) >= min_exact_hits:
+                fuzzy_future.cancel()
+                return exact_hits
+        return self.merge_hits(exact_hits, fuzzy_future.result)
+
+    def get_auto_complete_hits(self, query, lat, lng):
+        """
+        Gets ES hits for the auto complete query as per the `ES_AUTO_COMPLETE_STRATEGY` config.
+
+        > msearch: sends both exact and fuzzy queries in a single msearch.
+        > exact_first (default): sends the exact query and only sends the fuzzy query when exact one returns fewer than
+          `ES_AUTO_COMPLETE_MIN_EXACT_HITS` hits.
+        > hedged: same as exact_first but the fuzzy query is also fired if exact one hasn't returned within
+          `ES_AUTO_COMPLETE_HEDGE_DELAY` seconds.
+
+        :rtype: list
+        """
+        es = self.es
+        strategy = current_app.config.get("ES_AUTO_COMPLETE_STRATEGY", self.AUTO_COMPLETE_STRATEGY_EXACT_FIRST)
+        min_exact_hits = current_app.config.get("ES_AUTO_COMPLETE_MIN_EXACT_HITS", 1)
+
+        if strategy == self.AUTO_COMPLETE_STRATEGY_MSEARCH:
+            return self.get_msearch_hits(es, query, lat, lng)
+
+        if strategy == self.AUTO_COMPLETE_STRATEGY_HEDGED:
+            return self.get_hedged_hits(es, query, lat, lng, min_exact_hits)
+
+        exact_hits = self.search_travel_index(es, query, lat, lng, self.FUZZINESS_EXACT)
+        if len(exact_hits) >= min_exact_hits:
+            return exact_hits
+        return self.merge_hits(
+            exact_hits,
+            lambda: self.search_travel_index(es, query, lat, lng, self.FUZZINESS_AUTO)
+        )
+
+    def get_auto_complete_results(self, query, lat, lng, locale=Locales.EN):
+        """
+        Gets auto complete results for Travel search bar.
+
+        This function hits et_travel ES index to get autocomplete results for passed query string and then gets data.
+        Exact i.e. non-fuzzy results are prioritized over fuzzy results, see `get_auto_complete_hits`.
+        If `AUTOCOMPLETE_LOCAL_INDEX_ENABLED` is set, the in-process index is searched first and ES is only hit when
+        the index is cold or has no prefix match (e.g. a misspelt query which needs fuzzy matching).
+
+        Results are cached against the normalized query, the geohash bucket (~5km) of the user since hotels are
+        ranked by distance and the locale since degraded results are localized. Concurrent misses of the same key
+        only hit ES once, see `auto_complete_cache.stats` for hit/miss counters. Every call gets its own copy of the
+        cached results so building a response never changes them.
+
+        When ES is unhealthy, a degraded response is served from the in-process index if loaded, else from popular
+        destinations matching the query. Degraded results are only cached for `DEGRADED_RESULTS_CACHE_TTL` seconds.
+
+        :param str query: text query passed to find matches in indexed data.
+        :param float lat: latitude of user.
+        :param float lng: longitude of user.
+        :param str locale: locale of the user, used to get popular destinations in degraded mode.
+        :return: a formatted list of all hits got from ElasticSearch.
+        :rtype: list
+        """
+
+        if not query:
+            return []
+
+        normalized_query = ' '.join(query.lower().split())
+        cache_key = (
+            normalized_query,
+            encode_geohash(lat or 0.0, lng or 0.0, self.AUTO_COMPLETE_GEOHASH_PRECISION),
+            locale
+        )
+        _, auto_complete_results = self.auto_complete_cache.get_or_set(
+            cache_key,
+            lambda: self.get_uncached_auto_complete_results(normalized_query, lat, lng, locale),
+            ttl=lambda value: self.DEGRADED_RESULTS_CACHE_TTL if value[0] else None
+        )
+        return copy.deepcopy(auto_complete_results)
+
+    def get_uncached_auto_complete_results(self, query, lat, lng, locale):
+        """
+        Gets auto complete results from the in-process index or ES without looking up the results cache.
+
+        :return: whether the results are degraded along with the formatted results.
+        :rtype: tuple
+        """
+        results = None
+        if current_app.config.get("AUTOCOMPLETE_LOCAL_INDEX_ENABLED"):
+            results = AutocompleteRepo.search(query, lat, lng)
+        if not results:
+            try:
+                results = self.get_auto_complete_hits(query, lat, lng)
+            except UpstreamUnavailableError as e:
+                current_app.logger.warning('Serving degraded auto complete results: %s', e)
+                return True, self.get_degraded_auto_complete_results(query, lat, lng, locale)
+
+        return False, self.format_auto_complete_results(results)
 
+    def get_degraded_auto_complete_results(self, query, lat, lng, locale):
+        """
+        Gets auto complete results without ES.
+
+        Hits of the in-process index are served if it has been loaded, else popular destinations whose title starts
+        with the query.
+
+        :rtype: list
+        """
+        index = AutocompleteRepo.get_loaded_index()
+        if index is not None:
+            results = index.search(query, lat, lng, size=AutocompleteRepo.DEFAULT_RESULTS_SIZE)
+            if results:
+                return self.format_auto_complete_results(results)
+
+        degraded_results = []
+        for destination in self.get_popular_destinations(locale):
+            title = destination['title'] or ''
+            if not title.lower().startswith(query):
+                continue
+            api_params = dict(destination['api_params'], query=title)
+            degraded_results.append({
+                'title': title,
+                'full_title': title,
+                'sub_title': '',
+                'latitude': 0.0,
+                'longitude': 0.0,
+                'icon_image': Icons.LOCATION_PIN,
+                'type': api_params.get('search_type'),
+                'is_hww_instant_booking': None,
+                'api_params': api_params
+            })
+        return degraded_results
+
+    def format_auto_complete_results(self, results):
+        """
+        Formats the ES hits as required in Search API response.
+
+        :param list results: ES hits or hits of the in-process autocomplete index.
+        :rtype: list
+        """
+        auto_complete_response = []
         if results:
             for option in results:
                 document = option.get('_source', {})
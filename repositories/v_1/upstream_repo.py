@@ -0,0 +1,255 @@
+"""
+Upstream Repo module contains the pooled HTTP clients and circuit breakers used to call the upstream services.
+"""
+import os
+import random
+import threading
+import time
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+
+
+class UpstreamUnavailableError(Exception):
+    """
+    Raised when an upstream call is short circuited or fails because the upstream is unhealthy.
+    """
+
+
+class CircuitBreaker(object):
+    """
+    Circuit breaker guarding calls to an upstream dependency.
+
+    > closed: calls go through, `failure_threshold` consecutive failures open the circuit.
+    > open: calls are rejected for `recovery_timeout` seconds after which the circuit is half-open.
+    > half-open: up to `half_open_max_calls` probe calls go through, a success closes and a failure re-opens it.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30, half_open_max_calls=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.rejected_calls = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """
+        Returns whether a call may be made to the upstream right now.
+
+        :rtype: bool
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    self.rejected_calls += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self.half_open_calls = 0
+
+            if self.state == self.HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    self.rejected_calls += 1
+                    return False
+                self.half_open_calls += 1
+            return True
+
+    def record_success(self):
+        """
+        Records a successful call, closing the circuit if it was half-open.
+        """
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.half_open_calls = 0
+
+    def record_failure(self):
+        """
+        Records a failed call, opening the circuit if it was half-open or too many calls have failed.
+        """
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.half_open_calls = 0
+
+    @property
+    def stats(self):
+        """
+        Returns state and counters of the circuit breaker.
+
+        :rtype: dict
+        """
+        return {
+            'name': self.name,
+            'state': self.state,
+            'failures': self.failures,
+            'rejected_calls': self.rejected_calls
+        }
+
+
+class UpstreamClient(object):
+    """
+    Keep-alive HTTP client for a single upstream service.
+
+    Every worker process owns its own `requests.Session` so connections are reused across requests but never shared
+    across a fork. Idempotent calls are retried on connection errors, timeouts and gateway errors with exponential
+    backoff and full jitter.
+    """
+    IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+    RETRY_STATUS_CODES = frozenset([502, 503, 504])
+
+    def __init__(
+        self, name, pool_size=10, connect_timeout=3.05, read_timeout=15, max_retries=2, backoff_factor=0.1
+    ):
+        self.name = name
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.metrics = {
+            'requests': 0,
+            'failures': 0,
+            'retries': 0,
+            'total_time': 0.0,
+            'status_codes': {}
+        }
+        self._session = None
+        self._session_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """
+        Returns the session of current worker process, creating it after a fork.
+
+        :rtype: requests.Session
+        """
+        if self._session is None or self._session_pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._session_pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+                    self._session_pid = os.getpid()
+        return self._session
+
+    def get_backoff_time(self, attempt):
+        """
+        Returns seconds to wait before the passed retry attempt.
+
+        :rtype: float
+        """
+        return random.uniform(0, self.backoff_factor * (2 ** attempt))
+
+    def record(self, started_at, status_code=None, retried=False):
+        """
+        Records a single call in the metrics of upstream.
+        """
+        with self._lock:
+            self.metrics['requests'] += 1
+            self.metrics['total_time'] += time.monotonic() - started_at
+            if retried:
+                self.metrics['retries'] += 1
+            if status_code is None:
+                self.metrics['failures'] += 1
+            else:
+                status_codes = self.metrics['status_codes']
+                status_codes[status_code] = status_codes.get(status_code, 0) + 1
+
+    def request(self, method, url, **kwargs):
+        """
+        Sends the request through the pooled session.
+
+        :param str method: HTTP method.
+        :param str url: URL of the upstream endpoint.
+        :rtype: requests.Response
+        """
+        method = method.upper()
+        kwargs.setdefault('timeout', self.timeout)
+        max_retries = self.max_retries if method in self.IDEMPOTENT_METHODS else 0
+
+        attempt = 0
+        while True:
+            started_at = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self.record(started_at, retried=attempt > 0)
+                if attempt >= max_retries:
+                    raise
+            else:
+                self.record(started_at, status_code=response.status_code, retried=attempt > 0)
+                if response.status_code not in self.RETRY_STATUS_CODES or attempt >= max_retries:
+                    return response
+            attempt += 1
+            time.sleep(self.get_backoff_time(attempt))
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+class UpstreamRepo(object):
+    """
+    Registry of upstream clients.
+
+    Defaults are read from `UPSTREAM_POOL_SIZE`, `UPSTREAM_CONNECT_TIMEOUT`, `UPSTREAM_READ_TIMEOUT`,
+    `UPSTREAM_MAX_RETRIES` and `UPSTREAM_BACKOFF_FACTOR` and can be overridden per upstream through
+    `UPSTREAM_SETTINGS`, e.g. `{'redemption': {'read_timeout': 30}}`.
+    """
+    OUTLETS = 'outlets'
+    MERCHANT = 'merchant'
+    REDEMPTION = 'redemption'
+    USER_INFO = 'user_info'
+
+    _clients = {}
+    _clients_lock = threading.Lock()
+
+    @classmethod
+    def get_client(cls, name):
+        """
+        Returns the client of the passed upstream, creating it on first use.
+
+        :param str name: name of the upstream.
+        :rtype: UpstreamClient
+        """
+        client = cls._clients.get(name)
+        if client is None:
+            with cls._clients_lock:
+                client = cls._clients.get(name)
+                if client is None:
+                    config = current_app.config
+                    settings = {
+                        'pool_size': config.get('UPSTREAM_POOL_SIZE', 10),
+                        'connect_timeout': config.get('UPSTREAM_CONNECT_TIMEOUT', 3.05),
+                        'read_timeout': config.get('UPSTREAM_READ_TIMEOUT', 15),
+                        'max_retries': config.get('UPSTREAM_MAX_RETRIES', 2),
+                        'backoff_factor': config.get('UPSTREAM_BACKOFF_FACTOR', 0.1)
+                    }
+                    settings.update((config.get('UPSTREAM_SETTINGS') or {}).get(name, {}))
+                    client = UpstreamClient(name, **settings)
+                    cls._clients[name] = client
+        return client
+
+    @classmethod
+    def get_metrics(cls):
+        """
+        Returns metrics of all upstream clients of current worker.
+
+        :rtype: dict
+        """
+        return {name: dict(client.metrics) for name, client in cls._clients.items()}
@@ -0,0 +1,77 @@
+"""
+Tests of the task graph of Concurrency Repo.
+"""
+import pytest
+from flask import Flask
+
+from repositories.v_1.concurrency_repo import TaskGraph
+
+sqlalchemy = pytest.importorskip('sqlalchemy')
+from sqlalchemy import Column, ForeignKey, Integer, String, create_engine  # noqa: E402
+from sqlalchemy.ext.declarative import declarative_base  # noqa: E402
+from sqlalchemy.orm import relationship, scoped_session, sessionmaker  # noqa: E402
+from sqlalchemy.orm.exc import DetachedInstanceError  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+Base = declarative_base()
+
+
+class Merchant(Base):
+    __tablename__ = 'merchant'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+    packages = relationship('Package')
+
+
+class Package(Base):
+    __tablename__ = 'package'
+
+    id = Column(Integer, primary_key=True)
+    merchant_id = Column(Integer, ForeignKey('merchant.id'))
+    short_name = Column(String(50))
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = scoped_session(sessionmaker(bind=engine))
+    session.add(Merchant(id=1, name='Hotel', packages=[Package(id=1, short_name='Weekend'), Package(id=2)]))
+    session.commit()
+    session.remove()
+    yield session
+    session.remove()
+    engine.dispose()
+
+
+@pytest.fixture
+def app(session):
+    # Same as Flask-SQLAlchemy, the session of a thread is removed when its app context is torn down.
+    app = Flask(__name__)
+    app.teardown_appcontext(lambda exception: session.remove())
+    return app
+
+
+def test_orm_instance_returned_by_task_is_detached(app, session):
+    with app.test_request_context():
+        task_graph = TaskGraph()
+        task_graph.add('merchant', lambda: session.query(Merchant).get(1))
+        results = task_graph.run()
+
+    assert results['merchant'].name == 'Hotel'
+    with pytest.raises(DetachedInstanceError):
+        results['merchant'].packages
+
+
+def test_plain_data_returned_by_task_is_usable(app, session):
+    def get_package_names(merchant_id):
+        return [package.short_name for package in session.query(Merchant).get(merchant_id).packages]
+
+    with app.test_request_context():
+        task_graph = TaskGraph()
+        task_graph.add('package_names', get_package_names, 1)
+        results = task_graph.run()
+
+    assert not task_graph.errors
+    assert results['package_names'] == ['Weekend', None]
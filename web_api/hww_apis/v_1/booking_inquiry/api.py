@@ -1,7 +1,6 @@
 """
 Hww Booking Inquiry API.
 """
-import collections
 import json
 
 from phpserialize import dumps as php_json_dumps
@@ -82,47 +81,25 @@ class HwwBookingInquiry(BasePostResource):
         This function checks the following things:
 
         The booking dates in case a booking has been done in the past.
-        The rooms in case the ages or count of guests are invalid.
+        The rooms in case the ages or count of guests are invalid, valid rooms are kept parsed for processing.
 
         :rtype: bool
         """
-
-        return (
-            self.bookings_repo.validate_cin_cout_dates(self.check_in_date, self.check_out_date) and
-            self.bookings_repo.validate_rooms(self.rooms_params)
-        )
+        if self.bookings_repo.validate_cin_cout_dates(self.check_in_date, self.check_out_date):
+            self.parsed_rooms = self.bookings_repo.parse_rooms(self.rooms_params)
+            return True
+        return False
 
     def process_booking_data(self):
         """
         Process the booking information from request arguments and formats them as required.
 
-        > Gets guests adults and children information out of rooms params.
+        > Gets guests adults and children information out of rooms parsed during validation.
         """
-        rooms_data = {}
-        children_ages = []
-        self.number_of_guests = 0
-        self.number_of_children = 0
-
-        for room_info in self.rooms_params:
-            try:
-                rooms_data['Room']
-            except KeyError:
-                rooms_data['Room'] = []
-
-            single_room = collections.OrderedDict()
-
-            single_room['Adults'] = int(room_info.get('a', 0))
-            if room_info.get('c', 0) and room_info.get('c_ages', []):
-                single_room['Children'] = room_info.get('c', 0)
-                single_room['ChildAge'] = room_info.get('c_ages', [])
-
-            rooms_data['Room'].append(single_room)
-            self.number_of_guests += single_room.get('Adults', 0)
-            self.number_of_children += single_room.get('Children', 0)
-            children_ages.extend(single_room.get('ChildAge', []))
-
-        self.children_ages = ','.join([str(c_age) for c_age in children_ages])
-        self.rooms = rooms_data
+        self.number_of_guests = self.parsed_rooms.number_of_guests
+        self.number_of_children = self.parsed_rooms.number_of_children
+        self.children_ages = self.parsed_rooms.children_ages
+        self.rooms = self.parsed_rooms.rooms_data
 
     def book_request(self):
         """
@@ -150,6 +127,7 @@ class HwwBookingInquiry(BasePostResource):
         }
         self.enquiry_id = BookingRequest.save_booking_request(self.booking_request_data, self.logger)
         if self.enquiry_id:
+            BookingsRepo.invalidate_customer_bookings(self.customer.get('customer_id'))
             self.enquiry_number = "%09d" % self.enquiry_id
             self.enquiry_number = 'BK-{start}-{middle}-{last}'.format(
                 start=self.enquiry_number[0:3],
@@ -194,7 +172,7 @@ class HwwBookingInquiry(BasePostResource):
 
     def send_booking_email(self):
         """
-        Sends the booking email to both merchant and customer.
+        Sends the booking email to both merchant and customer, emails not queued are logged without failing the inquiry.
         """
         booking_request_email_data = php_json_dumps({
             '{FIRST_NAME}': self.customer.get('name'),
@@ -212,24 +190,16 @@ class HwwBookingInquiry(BasePostResource):
             '{merchant_id}': self.merchant_id,
             '{outlet_id}': self.outlet_id
         })
-        self.mail_repo.send_email(
-            email_type_id=self.mail_repo.BOOKING_ENQUIRY_MERCHANT,
-            email_data=php_json_dumps({}),
-            email=self.outlet_email,
-            language=self.messages_locale,
-            priority=self.mail_repo.PRIORITY_MEDIUM,
-            dump=False,
-            optional_data=booking_request_email_data.decode(errors='ignore')
-        )
-
-        self.mail_repo.send_email(
-            email_type_id=self.mail_repo.BOOKING_ENQUIRY_CUSTOMER,
+        self.mail_repo.send_emails(
+            recipients=[
+                (self.outlet_email, self.mail_repo.BOOKING_ENQUIRY_MERCHANT),
+                (self.booking_request_data['email'], self.mail_repo.BOOKING_ENQUIRY_CUSTOMER)
+            ],
             email_data=php_json_dumps({}),
-            email=self.booking_request_data['email'],
+            optional_data=booking_request_email_data.decode(errors='ignore'),
             language=self.messages_locale,
             priority=self.mail_repo.PRIORITY_MEDIUM,
-            dump=False,
-            optional_data=booking_request_email_data.decode(errors='ignore')
+            dump=False
         )
 
     def generate_final_response(self):
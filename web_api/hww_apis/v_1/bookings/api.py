@@ -28,6 +28,10 @@ class HwwBookings(BasePostResource):
         Populates the request arguments.
         """
         self.locale = self.request_args.get('language')
+        self.limit = max(self.request_args.get('limit') or 0, 0)
+        self.section = self.request_args.get('section')
+        self.upcoming_cursor = self.request_args.get('upcoming_cursor')
+        self.previous_cursor = self.request_args.get('previous_cursor')
 
     def initialize_local_variables(self):
         """
@@ -62,10 +66,18 @@ class HwwBookings(BasePostResource):
     def add_bookings_sections(self):
         """
         Adds the upcoming and previous or empty booking section in the bookings API response.
+
+        In case of paginated request, cursors of the next pages of the returned sections are added as well. Pages
+        after the first one are requested for a single section i.e. `upcoming` or `previous`, a cursor sent without the
+        section pages the section it belongs to.
         """
-        upcoming_section, previous_section = self.bookings_repo.get_user_previous_and_upcoming_bookings(
+        upcoming_section, previous_section, next_cursors = self.bookings_repo.get_user_previous_and_upcoming_bookings(
             customer_id=self.customer.get('customer_id'),
-            locale=self.locale
+            locale=self.locale,
+            limit=self.limit,
+            upcoming_cursor=self.upcoming_cursor,
+            previous_cursor=self.previous_cursor,
+            section=self.section
         )
         if upcoming_section or previous_section:
             if upcoming_section:
@@ -73,9 +85,13 @@ class HwwBookings(BasePostResource):
 
             if previous_section:
                 self.data['previous_section'] = previous_section
-        else:
+        elif not (self.section or self.upcoming_cursor or self.previous_cursor):
             self.add_empty_booking_section()
 
+        if self.limit:
+            for section, next_cursor in next_cursors.items():
+                self.data['{section}_next_cursor'.format(section=section)] = next_cursor
+
     def generate_final_response(self):
         """
         Generates the final response.
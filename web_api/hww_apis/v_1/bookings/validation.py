@@ -15,3 +15,35 @@ hww_bookings_api_parser.add_argument(
     type=language,
     location=['mobile', 'values', 'json']
 )
+
+hww_bookings_api_parser.add_argument(
+    name="limit",
+    required=False,
+    default=0,
+    type=int,
+    location=['mobile', 'values', 'json']
+)
+
+hww_bookings_api_parser.add_argument(
+    name="section",
+    required=False,
+    default='',
+    type=str,
+    location=['mobile', 'values', 'json']
+)
+
+hww_bookings_api_parser.add_argument(
+    name="upcoming_cursor",
+    required=False,
+    default='',
+    type=str,
+    location=['mobile', 'values', 'json']
+)
+
+hww_bookings_api_parser.add_argument(
+    name="previous_cursor",
+    required=False,
+    default='',
+    type=str,
+    location=['mobile', 'values', 'json']
+)
@@ -6,8 +6,7 @@ from requests import codes
 from app_configurations.settings import HWW_LOG_PATH
 from common.base_resource import BasePostResource
 from common.utils.authentication import get_current_customer
-from models.mongo_models.searches import Searches
-from models.mongo_models.viewed_hotels import ViewedHotels
+from repositories.v_1.history_repo import HistoryRepo
 from web_api.hww_apis.v_1.clear_history.validation import \
     hww_clear_history_parser
 
@@ -46,14 +45,14 @@ class HwwClearHistory(BasePostResource):
         """
         if self.customer['is_user_logged_in']:
             if self.section_identifier == self.SEARCH_IDENTIFIER:
-                if Searches.deactivate_recent_searches(self.customer['customer_id']):
+                if HistoryRepo.clear_recent_searches(self.customer['customer_id']):
                     self.status_code = codes.ok
                 else:
                     self.status_code = codes.already_reported
                 self.success = True
 
             elif self.section_identifier == self.HOME_IDENTIFIER:
-                if ViewedHotels.deactivate_viewed_hotels(customer_id=self.customer['customer_id']):
+                if HistoryRepo.clear_viewed_hotels(self.customer['customer_id']):
                     self.status_code = codes.ok
                 else:
                     self.status_code = codes.already_reported
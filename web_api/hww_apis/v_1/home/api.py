@@ -12,6 +12,8 @@ from models.customer_order import CustomerOrder
 from models.destinations import Destinations
 from models.hb_order import HbOrder
 from models.mongo_models.viewed_hotels import ViewedHotels
+from repositories.v_1.concurrency_repo import TaskGraph
+from repositories.v_1.customer_state_repo import CustomerStateRepo
 from repositories.v_1.home_repo import HomeRepo
 from repositories.v_1.search_repo import SearchRepo
 from web_api.hww_apis.v_1.home.validation import hww_home_api_parser
@@ -41,6 +43,8 @@ class HwwHome(BasePostResource):
         Initializes local variables.
         """
         self.customer = get_current_customer()
+        self.has_bookings = False
+        self.recent_hotels_count = 0
         self.data = {
             "message": "",
             "title": self.home_repo.SCREEN_TITLE,
@@ -54,19 +58,21 @@ class HwwHome(BasePostResource):
         Initializes the different repos.
         """
         self.home_repo = HomeRepo()
-        self.search_repo = SearchRepo()
 
-    def add_destinations_section(self):
+    def get_destinations_section(self):
         """
-        Adds destinations section in Home API.
+        Gets destinations section of Home API.
 
         By default, five destinations will be shown on home screen and the sixth place will be a 'See all destinations'
         tile. When user clicks on the 'See All Destinations' tile, it'll return all destinations.
         """
         destinations = Destinations.get_home_destinations(locale=self.locale, limit=self.home_repo.DESTINATIONS_LIMIT)
         popular_destinations = []
+        active_hotels_counts = self.home_repo.get_active_hotels_counts(
+            [destination.location_id for destination in destinations]
+        )
         for destination in destinations:
-            active_hotels_count = Destinations.get_active_hotels(location_id=destination.location_id)
+            active_hotels_count = active_hotels_counts.get(destination.location_id, 0)
             destination_obj = {
                 'destination_id': destination.id,
                 'item_title': destination.title,
@@ -82,10 +88,10 @@ class HwwHome(BasePostResource):
                     "search_type": destination.type,
                 }
             }
-            if destination.type == self.search_repo.SEARCH_TYPE_CITY:
+            if destination.type == SearchRepo.SEARCH_TYPE_CITY:
                 destination_obj['api_params']['billing_city'] = destination.billing_city
 
-            if destination.type == self.search_repo.SEARCH_TYPE_COUNTRY:
+            if destination.type == SearchRepo.SEARCH_TYPE_COUNTRY:
                 destination_obj['api_params']['billing_country'] = destination.billing_country
 
             popular_destinations.append(destination_obj)
@@ -102,20 +108,67 @@ class HwwHome(BasePostResource):
             }
         )
 
-        self.data["home_sections"].append(
-            {
-                "section_identifier": "section_destinations",
-                "accessory_section_image": "",
-                "section_image": "",
-                "see_all_button_title": CommonStrings.SEE_ALL,
-                "section_title": self.home_repo.DESTINATIONS_TITLE,
-                "clear_button_title": "",
-                "section_list": popular_destinations
-            }
+        return {
+            "section_identifier": "section_destinations",
+            "accessory_section_image": "",
+            "section_image": "",
+            "see_all_button_title": CommonStrings.SEE_ALL,
+            "section_title": self.home_repo.DESTINATIONS_TITLE,
+            "clear_button_title": "",
+            "section_list": popular_destinations
+        }
+
+    def fetch_customer_data(self):
+        """
+        Fetches the data of user specific sections concurrently.
+
+        States cached for the customer are used as is. The rest, HWW bookings, getaways bookings and recently viewed
+        hotels, live in different databases so they are probed in parallel within `HOME_CUSTOMER_PROBES_DEADLINE`
+        seconds, a probe not done by then is treated as empty and not cached. Time taken by every probe is logged.
+        """
+        if not self.customer['is_user_logged_in']:
+            return
+
+        customer_id = self.customer.get('customer_id')
+        has_bookings = CustomerStateRepo.get_state(customer_id, CustomerStateRepo.HAS_BOOKINGS)
+        recent_hotels_count = CustomerStateRepo.get_state(customer_id, CustomerStateRepo.RECENT_HOTELS_COUNT)
+        if has_bookings is not None and recent_hotels_count is not None:
+            self.has_bookings, self.recent_hotels_count = has_bookings, recent_hotels_count
+            return
+
+        task_graph = TaskGraph(
+            deadline=current_app.config.get('HOME_CUSTOMER_PROBES_DEADLINE', 5),
+            logger=self.logger
         )
-        destinations_list = self.home_repo.get_all_destination_data(locale=self.locale)
-        if destinations_list:
-            self.data["destination_list"] = destinations_list
+        if has_bookings is None:
+            task_graph.add(
+                'hww_bookings',
+                CustomerOrder.get_user_bookings_count,
+                customer_id=customer_id,
+                hww_module_id=current_app.config.get('HWW_MODULE_ID')
+            )
+            task_graph.add('getaways_bookings', HbOrder.get_customer_getaways_bookings_count, customer_id=customer_id)
+        if recent_hotels_count is None:
+            task_graph.add(
+                'recent_hotels',
+                ViewedHotels.get_recently_viewed_hotels,
+                customer_id=customer_id,
+                get_count=True
+            )
+        results = task_graph.run()
+
+        if has_bookings is None:
+            has_bookings = bool(results.get('hww_bookings') or results.get('getaways_bookings'))
+            if has_bookings or not ({'hww_bookings', 'getaways_bookings'} & set(task_graph.errors)):
+                CustomerStateRepo.set_state(customer_id, CustomerStateRepo.HAS_BOOKINGS, has_bookings)
+        if recent_hotels_count is None:
+            recent_hotels_count = results.get('recent_hotels') or 0
+            if 'recent_hotels' in results:
+                CustomerStateRepo.set_state(customer_id, CustomerStateRepo.RECENT_HOTELS_COUNT, recent_hotels_count)
+
+        self.has_bookings, self.recent_hotels_count = has_bookings, recent_hotels_count
+        if self.logger:
+            self.logger.info('Home probes durations: %s', task_graph.durations)
 
     def add_bookings_section(self):
         """
@@ -123,24 +176,16 @@ class HwwHome(BasePostResource):
 
         This section is only shown if user has at least one confirmed or cancelled booking.
         """
-        if self.customer['is_user_logged_in']:
-            hww_module_id = current_app.config.get('HWW_MODULE_ID')
-            user_booking = CustomerOrder.get_user_bookings_count(
-                customer_id=self.customer.get('customer_id'),
-                hww_module_id=hww_module_id
-            ) or HbOrder.get_customer_getaways_bookings_count(
-                customer_id=self.customer.get('customer_id')
-            )
-            if user_booking:
-                self.data['home_sections'].append({
-                    "section_identifier": "section_my_booking",
-                    "section_title": self.home_repo.MY_BOOKINGS_TITLE,
-                    "see_all_button_title": "",
-                    "content_description": "",
-                    "accessory_section_image": Icons.CALENDAR,
-                    "section_image": Icons.RIGHT_BLUE,
-                    "section_list": []
-                })
+        if self.has_bookings:
+            self.data['home_sections'].append({
+                "section_identifier": "section_my_booking",
+                "section_title": self.home_repo.MY_BOOKINGS_TITLE,
+                "see_all_button_title": "",
+                "content_description": "",
+                "accessory_section_image": Icons.CALENDAR,
+                "section_image": Icons.RIGHT_BLUE,
+                "section_list": []
+            })
 
     def add_recently_viewed_hotels_section(self):
         """
@@ -148,82 +193,96 @@ class HwwHome(BasePostResource):
 
         Recently viewed hotels section show only if a user has at least one recently viewed hotel.
         """
-        if self.customer['is_user_logged_in']:
-            recent_hotels = ViewedHotels.get_recently_viewed_hotels(
-                customer_id=self.customer.get('customer_id'),
-                get_count=True
-            )
+        if self.recent_hotels_count:
+            self.data['home_sections'].append({
+                "section_identifier": "section_recent_hotels",
+                "accessory_section_image": "",
+                "section_image": "",
+                "see_all_button_title": "",
+                "section_title": self.home_repo.RECENT_HOTELS_TITLE,
+                "content_description": self.home_repo.RECENT_HOTELS_COUNT.format(
+                    recent_hotels_count=self.recent_hotels_count
+                ),
+                "section_list": [
+                    {
+                        "api_params": {
+                            "is_recently_viewed_listing": True
 
-            if recent_hotels:
-                self.data['home_sections'].append({
-                    "section_identifier": "section_recent_hotels",
-                    "accessory_section_image": "",
-                    "section_image": "",
-                    "see_all_button_title": "",
-                    "section_title": self.home_repo.RECENT_HOTELS_TITLE,
-                    "content_description": self.home_repo.RECENT_HOTELS_COUNT.format(recent_hotels_count=recent_hotels),
-                    "section_list": [
-                        {
-                            "api_params": {
-                                "is_recently_viewed_listing": True
-
-                            }
                         }
-                    ]
+                    }
+                ]
 
-                })
+            })
 
-    def add_travel_style_section(self):
+    def get_travel_style_section(self):
         """
-        Adds travel style section to Home API response.
+        Gets travel style section of Home API response.
 
         Travel style tiles are sections available for all users based on merchant attributes shown as per Travel
         requirements. For example: Stay & Brunch, Stay & Relax, Stay & Dine etc.
         """
         travel_style_tiles = self.home_repo.get_travel_style_tiles()
         if travel_style_tiles:
-            self.data["home_sections"].append(
-                {
-                    "section_title": self.home_repo.YOUR_TRAVEL_STYLE_TITLE,
-                    "section_identifier": "section_travel_style",
-                    "accessory_section_image": "",
-                    "section_image": "",
-                    "see_all_button_title": "",
-                    "section_list": travel_style_tiles,
-                    "content_description": ""
-                }
-            )
+            return {
+                "section_title": self.home_repo.YOUR_TRAVEL_STYLE_TITLE,
+                "section_identifier": "section_travel_style",
+                "accessory_section_image": "",
+                "section_image": "",
+                "see_all_button_title": "",
+                "section_list": travel_style_tiles,
+                "content_description": ""
+            }
 
-    def add_curated_section(self):
+    def get_curated_section(self):
         """
-        Adds curated section to Home API response.
+        Gets curated section of Home API response.
 
         Curated section on home screen is similar to more to Enjoy section on the Entertainer “home screen”
         e.g: Valentine Day Special.
         """
         curated_tiles = self.home_repo.get_curated_tiles()
         if curated_tiles:
-            self.data["home_sections"].append(
-                {
-                    "section_title": self.home_repo.CURATED_TITLE,
-                    "section_identifier": "section_curated_list",
-                    "accessory_section_image": "",
-                    "section_image": "",
-                    "see_all_button_title": "",
-                    "section_list": curated_tiles,
-                    "content_description": ""
-                }
-            )
+            return {
+                "section_title": self.home_repo.CURATED_TITLE,
+                "section_identifier": "section_curated_list",
+                "accessory_section_image": "",
+                "section_image": "",
+                "see_all_button_title": "",
+                "section_list": curated_tiles,
+                "content_description": ""
+            }
+
+    def build_home_skeleton(self):
+        """
+        Builds the sections of Home API which are same for all the users of a locale.
+
+        :rtype: dict
+        """
+        return {
+            'destinations_section': self.get_destinations_section(),
+            'destination_list': self.home_repo.get_all_destination_data(locale=self.locale),
+            'travel_style_section': self.get_travel_style_section(),
+            'curated_section': self.get_curated_section()
+        }
 
     def process_data(self):
         """
         Process the data of Hww Home API.
+
+        Sections same for all the users of a locale are read from the cached home skeleton, only bookings and recently
+        viewed hotels sections are built per user.
         """
-        self.add_destinations_section()
+        home_skeleton = self.home_repo.get_home_skeleton(self.locale, self.build_home_skeleton)
+        self.fetch_customer_data()
+
+        self.data["home_sections"].append(home_skeleton['destinations_section'])
+        if home_skeleton['destination_list']:
+            self.data["destination_list"] = home_skeleton['destination_list']
         self.add_bookings_section()
         self.add_recently_viewed_hotels_section()
-        self.add_travel_style_section()
-        self.add_curated_section()
+        for section in (home_skeleton['travel_style_section'], home_skeleton['curated_section']):
+            if section:
+                self.data["home_sections"].append(section)
 
     def generate_final_response(self):
         """
@@ -3,7 +3,6 @@ Hww Hotel Details API.
 """
 import json
 
-import requests
 from flask import current_app, request
 from requests import codes
 
@@ -14,11 +13,11 @@ from common.constants.icons import Icons
 from common.constants.strings import CommonStrings
 from common.constants.values import CommonValues
 from common.utils.authentication import get_current_customer
-from models.merchant_attribute import MerchantAttribute
-from models.merchant_attributes_travel import MerchantAttributesTravel
-from models.mongo_models.searches import Searches
-from models.mongo_models.viewed_hotels import ViewedHotels
+from repositories.v_1.amenities_repo import AmenitiesRepo
+from repositories.v_1.concurrency_repo import TaskGraph
 from repositories.v_1.details_repo import HotelDetailsRepo
+from repositories.v_1.history_repo import HistoryRepo
+from repositories.v_1.upstream_repo import UpstreamRepo
 from web_api.hww_apis.v_1.hotel_details.validation import \
     hww_hotel_details_api_parser
 
@@ -72,6 +71,8 @@ class HwwDetails(BasePostResource):
         self.merchant_response_data = {}
         self.hotel_details_sections = []
         self.merchant_offers = []
+        self.amenities = []
+        self.packages = []
 
     def add_hotel_header_section(self):
         """
@@ -138,18 +139,12 @@ class HwwDetails(BasePostResource):
         Adds HWW hotel amenities section in response.
         """
         amenities_section_list = []
-        amenities = MerchantAttribute.get_amenities_by_locale(
-            locale=self.locale,
-            category=CommonValues.TRAVEL_CATEGORY_ID
-        )
-        merchant_attributes_travel = MerchantAttributesTravel.get_attributes(self.merchant_id)
 
-        for amenity in amenities:
-            if getattr(merchant_attributes_travel, amenity.attribute_key) not in [0, -1]:
-                amenities_section_list.append({
-                    'title': amenity.attribute_name,
-                    'value': amenity.image_url or Icons.DEFAULT_AMENITY
-                })
+        for amenity in self.amenities:
+            amenities_section_list.append({
+                'title': amenity.attribute_name,
+                'value': amenity.image_url or Icons.DEFAULT_AMENITY
+            })
 
         self.hotel_details_sections.append({
             "section_identifier": "amenities",
@@ -230,7 +225,8 @@ class HwwDetails(BasePostResource):
         packages_list = self.details_repo.get_hotel_packages(
             outlet_id=self.outlet_id,
             merchant_id=self.merchant_id,
-            currency=self.currency
+            currency=self.currency,
+            packages=self.packages
         )
         if packages_list:
             self.hotel_details_sections.append({
@@ -365,19 +361,63 @@ class HwwDetails(BasePostResource):
         """
         Gets merchant info from DB.
 
-        Currently setting hww instant booking flag in case it comes zero.
+        Currently returning hww instant booking flag of merchant in case it comes zero.
 
+        :rtype: bool
         """
         if not self.is_hww_instant_booking:
             from models.merchant import Merchant
-            self.is_hww_instant_booking = Merchant.get_by_id(self.merchant_id).hww_instant_booking
+            return Merchant.get_by_id(self.merchant_id).hww_instant_booking
+        return self.is_hww_instant_booking
+
+    @staticmethod
+    def get_packages(outlet_id, merchant_id, is_hww_instant_booking):
+        """
+        Gets packages of the outlet from DB in case of HWW instant booking merchant.
+
+        :rtype: list
+        """
+        if is_hww_instant_booking:
+            return HotelDetailsRepo.get_packages(outlet_id, merchant_id)
+        return []
+
+    def fetch_hotel_data(self):
+        """
+        Fetches all data required in hotel details concurrently.
+
+        Merchant info, merchant data from merchant service and amenities offered by merchant don't depend on each
+        other so they are fetched in parallel, packages are fetched as soon as merchant info tells if merchant is an
+        instant booking merchant. All fetches must be done within `HOTEL_DETAILS_FETCH_DEADLINE` seconds, data not
+        fetched by then is treated as missing.
+        """
+        task_graph = TaskGraph(
+            deadline=current_app.config.get('HOTEL_DETAILS_FETCH_DEADLINE', 10),
+            logger=self.logger
+        )
+        task_graph.add('merchant_info', self.get_merchant_info)
+        task_graph.add('merchant_data', self.get_merchant_data)
+        task_graph.add('amenities', AmenitiesRepo.get_merchant_amenities, self.merchant_id, self.locale)
+        task_graph.add(
+            'packages',
+            lambda: self.get_packages(self.outlet_id, self.merchant_id, task_graph.results['merchant_info']),
+            depends_on=('merchant_info',)
+        )
+        results = task_graph.run()
+
+        self.is_hww_instant_booking = results.get('merchant_info', self.is_hww_instant_booking)
+        self.merchant_response_data = results.get('merchant_data') or {}
+        self.amenities = results.get('amenities') or []
+        self.packages = results.get('packages') or []
 
     def get_merchant_data(self):
         """
         Gets merchant data based on company.
 
         If it's a White-Label company it uses a PHP call. If it's entertainer, it uses a Python API call.
+
+        :rtype: dict
         """
+        merchant_response_data = {}
         try:
             request_data = {}
             request_data.update(self.request_args)
@@ -401,15 +441,16 @@ class HwwDetails(BasePostResource):
                 'currency': self.currency,
                 'outlet_id': self.outlet_id,
             })
-            response = requests.get(
+            response = UpstreamRepo.get_client(UpstreamRepo.MERCHANT).get(
                 current_app.config.get('MERCHANT_URL').format(merchant_id=self.merchant_id),
                 params=request_data,
                 headers={"Authorization": request.environ.get('HTTP_AUTHORIZATION')},
             )
             if response.status_code == 200:
-                self.merchant_response_data = json.loads(response.text)['data']['merchant']
+                merchant_response_data = json.loads(response.text)['data']['merchant']
         except Exception as e:
             self.logger.exception(e)
+        return merchant_response_data
 
     def add_inquiry_data_section(self):
         """
@@ -461,14 +502,14 @@ class HwwDetails(BasePostResource):
         Saves the hotels in MONGO for it to be accessible.
         """
         if self.customer["is_user_logged_in"]:
-            ViewedHotels.save_viewed_hotel(
+            HistoryRepo.save_viewed_hotel(
                 customer_id=self.customer["customer_id"],
                 outlet_id=self.outlet_id,
                 merchant_id=self.merchant_id,
                 title=self.merchant_response_data.get('name'),
             )
             if self.query and self.search_type:
-                Searches.save_recent_search(
+                HistoryRepo.save_recent_search(
                     customer_id=self.customer["customer_id"],
                     outlet_id=self.outlet_id,
                     merchant_id=self.merchant_id,
@@ -494,8 +535,7 @@ class HwwDetails(BasePostResource):
         self.initialize_local_variables()
 
         if self.merchant_id:
-            self.get_merchant_info()
-            self.get_merchant_data()
+            self.fetch_hotel_data()
             self.get_merchant_offers_data()
             if self.merchant_offers:
                 self.process_hotel_details()
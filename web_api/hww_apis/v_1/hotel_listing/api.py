@@ -3,7 +3,6 @@ Hww Hotel Listing API.
 """
 import json
 
-import requests
 from flask import current_app, request
 
 from app_configurations.settings import HWW_LOG_PATH
@@ -11,9 +10,10 @@ from common.base_resource import BasePostResource
 from common.constants.colors import Colors
 from common.utils.api_utils import multi_key_sort
 from common.utils.authentication import get_company, get_current_customer
-from models.mongo_models.searches import Searches
 from models.mongo_models.viewed_hotels import ViewedHotels
+from repositories.v_1.history_repo import HistoryRepo
 from repositories.v_1.listing_repo import ListingRepo
+from repositories.v_1.upstream_repo import UpstreamRepo
 from web_api.hww_apis.v_1.hotel_listing.validation import \
     hww_hotel_listing_api_parser
 
@@ -146,7 +146,7 @@ class HwwHotelListing(BasePostResource):
                 else:
                     return
 
-            outlets = requests.get(
+            outlets = UpstreamRepo.get_client(UpstreamRepo.OUTLETS).get(
                 current_app.config.get('OUTLETS_URL'),
                 params=params,
                 headers={"Authorization": request.environ.get('HTTP_AUTHORIZATION')}
@@ -249,7 +249,7 @@ class HwwHotelListing(BasePostResource):
         Saves the search in MONGO for it to be accessible.
         """
         if self.customer["is_user_logged_in"] and self.query and self.search_type:
-            Searches.save_recent_search(
+            HistoryRepo.save_recent_search(
                 customer_id=self.customer["customer_id"],
                 title=self.query,
                 search_type=self.search_type,
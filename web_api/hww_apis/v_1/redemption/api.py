@@ -1,4 +1,3 @@
-import requests
 from flask import current_app, request
 
 from app_configurations.settings import HWW_LOG_PATH
@@ -7,6 +6,8 @@ from common.constants.strings import CommonStrings
 from common.utils.api_utils import (handle_response_in_case_of_error,
                                     process_request_response_data)
 from common.utils.authentication import get_current_customer
+from repositories.v_1.bookings_repo import BookingsRepo
+from repositories.v_1.upstream_repo import UpstreamRepo
 from web_api.hww_apis.v_1.redemption.validation import redemption_parser
 
 
@@ -58,13 +59,14 @@ class HwwRedemption(BasePostResource):
                 '__sid': self.customer.get('id'),
                 'analytics_company': self.company
             })
-            self.response = requests.post(
+            self.response = UpstreamRepo.get_client(UpstreamRepo.REDEMPTION).post(
                 current_app.config.get('REDEMPTION_URL'),
                 json=request_data,
                 headers={"Authorization": request.environ.get('HTTP_AUTHORIZATION')}
             )
         except Exception as e:
             self.logger.exception(e)
+        BookingsRepo.invalidate_customer_bookings(self.user_id)
 
     def generate_final_response(self):
         """
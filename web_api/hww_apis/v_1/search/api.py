@@ -60,6 +60,7 @@ class HwwSearch(BasePostResource):
             query=self.query,
             lat=self.latitude,
             lng=self.longitude,
+            locale=self.locale
         )
         self.data["search_result"] = query_results
         if query_results: